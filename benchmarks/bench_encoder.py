@@ -0,0 +1,41 @@
+"""
+Micro-benchmark of setcolor command encoding.
+
+Compares the bytes encoder used by `Lightpack` against formatting each LED
+into a string, joining and encoding, as was done before. Run from the
+repository root:
+
+	python benchmarks/bench_encoder.py
+"""
+
+from __future__ import print_function
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import lightpack
+
+def encodeString(pairs):
+	defs = ['%d-%d,%d,%d' % tuple([i] + list(rgb)) for i, rgb in pairs]
+	return str.encode('setcolor:%s' % ';'.join(defs) + '\n')
+
+def main():
+	lp = lightpack.Lightpack()
+	print("%6s %14s %14s %8s" % ("LEDs", "string (us)", "bytes (us)", "speedup"))
+	for count in (30, 300, 1000):
+		pairs = [(i + 1, tuple([random.randint(0, 255) for _ in range(3)])) \
+				for i in range(count)]
+		assert bytes(lp._encodeColours(pairs)) == encodeString(pairs)
+		number = max(1, 300000 // count)
+		string = min(timeit.repeat(lambda: encodeString(pairs), number=number,
+				repeat=5)) / number
+		encoded = min(timeit.repeat(lambda: lp._encodeColours(pairs),
+				number=number, repeat=5)) / number
+		print("%6d %14.1f %14.1f %7.2fx" % (count, string * 1e6, encoded * 1e6,
+				string / encoded))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,78 @@
+"""
+Import-time benchmark of `import lightpack`.
+
+Imports the module in fresh interpreters with `python -X importtime`
+(Python 3.7 or later) and reports the time spent in the module itself, and
+the cumulative time including the standard library modules it pulled in.
+Only the module's own time is budgeted, since the standard library's varies
+from machine to machine. Exits with status 1 if its median is over budget, or
+if any module which should only be imported when needed was imported. Run
+from the repository root:
+
+	python benchmarks/bench_import.py [--runs 20] [--budget 5]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import py_compile
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Modules `import lightpack` must not import
+LAZY = ('numpy', 'boltons', 'past', 'future', 'distutils', 'colour',
+		'multiprocessing', 'concurrent', 'random', 'threading', 'contextlib')
+
+def importTimes():
+	"""
+	Import lightpack in a new interpreter.
+
+	:returns: dictionary of (self, cumulative) import times in microseconds,
+	keyed by module name
+	"""
+	output = subprocess.check_output([sys.executable, '-X', 'importtime',
+			'-c', 'import lightpack'], cwd=ROOT, stderr=subprocess.STDOUT)
+	times = {}
+	for line in output.decode('utf-8').splitlines():
+		if not line.startswith('import time:') or 'cumulative' in line:
+			continue
+		own, cumulative, name = line[len('import time:'):].split('|')
+		times[name.strip()] = (int(own), int(cumulative))
+	return times
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+	parser.add_argument('--runs', type=int, default=20,
+			help="number of interpreters to start (default 20)")
+	parser.add_argument('--budget', type=float, default=5.0,
+			help="largest acceptable median of the module's own time in "
+			"milliseconds (default 5)")
+	args = parser.parse_args()
+
+	# Measure loading from cached bytecode, as after installation
+	py_compile.compile(os.path.join(ROOT, 'lightpack.py'), doraise=True)
+	runs = [importTimes() for _ in range(args.runs)]
+	owns = sorted([times['lightpack'][0] / 1000.0 for times in runs])
+	totals = sorted([times['lightpack'][1] / 1000.0 for times in runs])
+	median = owns[len(owns) // 2]
+	print("import lightpack: own min %.1f ms, median %.1f ms, max %.1f ms "
+			"(budget %.1f ms)" % (owns[0], median, owns[-1], args.budget))
+	print("including the standard library: min %.1f ms, median %.1f ms, "
+			"max %.1f ms" % (totals[0], totals[len(totals) // 2], totals[-1]))
+
+	failed = False
+	imported = sorted(set([name.split('.')[0] for times in runs \
+			for name in times if name.split('.')[0] in LAZY]))
+	if imported:
+		print("Imported modules which should be lazy: %s" % ', '.join(imported))
+		failed = True
+	if median > args.budget:
+		print("Over budget")
+		failed = True
+	sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,131 @@
+"""
+Micro-benchmark of getcolors and getleds payload parsing.
+
+Compares `Protocol.readColours` and `Protocol.readRectangles`, which check and
+convert a whole payload at once, against reading it snippet by snippet, as was
+done before. Before timing, both are run on randomly generated and mutated
+payloads to check they return the same dictionaries and raise the same
+errors. Run from the repository root:
+
+	python benchmarks/bench_parser.py [--fuzz 20000] [--seed 0]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import lightpack
+
+Protocol = lightpack.Protocol
+
+def readColoursBySnippet(payload):
+	return dict([Protocol.readColour(snippet) \
+			for snippet in Protocol.readList(payload)])
+
+def readRectanglesBySnippet(payload):
+	return dict([Protocol.readRectangle(snippet) \
+			for snippet in Protocol.readList(payload)])
+
+def colourPayload(count):
+	return ''.join(['%d-%d,%d,%d;' % (i + 1, random.randint(0, 255),
+			random.randint(0, 255), random.randint(0, 255)) \
+			for i in range(count)])
+
+def rectanglePayload(count, left=0):
+	return ''.join(['%d-%d,%d,%d,%d;' % (i, random.randint(left, 3840),
+			random.randint(0, 2160), random.randint(1, 500),
+			random.randint(1, 500)) for i in range(count)])
+
+def offScreenPayload(count):
+	"""
+	Get a getleds payload with some rectangles left of the primary screen, so 
+	at negative positions.
+	"""
+	return rectanglePayload(count, -1920)
+
+def mutate(payload):
+	"""
+	Change a payload in a few random places.
+	"""
+	characters = list(payload)
+	for _ in range(random.randint(1, 3)):
+		position = random.randint(0, len(characters))
+		mutation = random.choice(('insert', 'delete', 'replace', 'swap'))
+		character = random.choice('0123456789-,;; +x٣')
+		if mutation == 'insert' or not characters:
+			characters.insert(position, character)
+		elif mutation == 'delete':
+			del characters[position - 1]
+		elif mutation == 'replace':
+			characters[position - 1] = character
+		else:
+			other = random.randint(0, len(characters) - 1)
+			characters[position - 1], characters[other] = \
+					characters[other], characters[position - 1]
+	return ''.join(characters)
+
+def outcome(parse, payload):
+	try:
+		return parse(payload)
+	except Exception as e:
+		return type(e), str(e)
+
+def fuzz(runs):
+	"""
+	Check both parsers agree on random payloads, valid and mutated.
+
+	:returns: number of disagreements
+	"""
+	failures = 0
+	pairs = ((Protocol.readColours, readColoursBySnippet, colourPayload),
+			(Protocol.readRectangles, readRectanglesBySnippet, rectanglePayload),
+			(Protocol.readRectangles, readRectanglesBySnippet, offScreenPayload))
+	for run in range(runs):
+		fast, reference, generate = random.choice(pairs)
+		payload = generate(random.randint(0, 12))
+		if run % 2:
+			payload = mutate(payload)
+		if outcome(fast, payload) != outcome(reference, payload):
+			print("Disagreement on %r" % payload)
+			failures += 1
+	return failures
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+	parser.add_argument('--fuzz', type=int, default=20000,
+			help="number of random payloads to check (default 20000)")
+	parser.add_argument('--seed', type=int, default=0,
+			help="random seed (default 0)")
+	args = parser.parse_args()
+	random.seed(args.seed)
+
+	failures = fuzz(args.fuzz)
+	print("%d random payloads, %d disagreements" % (args.fuzz, failures))
+	if failures:
+		sys.exit(1)
+
+	print("%8s %6s %16s %16s %8s" % ("payload", "LEDs", "snippets (us)",
+			"whole (us)", "speedup"))
+	for name, fast, reference, generate in (
+			('colours', Protocol.readColours, readColoursBySnippet,
+					colourPayload),
+			('sizes', Protocol.readRectangles, readRectanglesBySnippet,
+					rectanglePayload)):
+		for count in (300, 1000, 5000):
+			payload = generate(count)
+			assert fast(payload) == reference(payload)
+			number = max(1, 100000 // count)
+			before = min(timeit.repeat(lambda: reference(payload),
+					number=number, repeat=5)) / number
+			after = min(timeit.repeat(lambda: fast(payload), number=number,
+					repeat=5)) / number
+			print("%8s %6d %16.1f %16.1f %7.2fx" % (name, count, before * 1e6,
+					after * 1e6, before / after))
+
+if __name__ == '__main__':
+	main()
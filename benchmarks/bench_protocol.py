@@ -0,0 +1,58 @@
+"""
+Micro-benchmark of response framing by the sans-IO `Protocol`.
+
+Feeds a stream of pipelined responses to a `Protocol` in reads of several
+sizes, with no socket involved, and reports the time to parse each response.
+Run from the repository root:
+
+	python benchmarks/bench_protocol.py
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import lightpack
+
+GREETING = b'Lightpack API v2.2 (type "help" for more info)\r\n'
+
+def parse(stream, commands, size):
+	"""
+	Parse a greeting and responses, read `size` bytes at a time.
+
+	:returns: number of responses parsed
+	"""
+	protocol = lightpack.Protocol()
+	for command in commands:
+		protocol.send(command)
+	parsed = -1
+	for start in range(0, len(stream), size):
+		protocol.receive(stream[start:start + size])
+		while protocol.nextEvent() is not None:
+			parsed += 1
+	return parsed
+
+def main():
+	colours = b'colors:' + b''.join([b'%d-255,128,0;' % i \
+			for i in range(1, 301)])
+	streams = (
+		("ok", [b'ok'] * 1000),
+		("status", [b'status:on'] * 1000),
+		("colors x300", [colours] * 20),
+	)
+	print("%12s %10s %14s" % ("response", "read size", "per line (us)"))
+	for name, responses in streams:
+		stream = GREETING + b''.join([r + b'\r\n' for r in responses])
+		commands = ['getstatus'] * len(responses)
+		for size in (64, 4096, 65536):
+			assert parse(stream, commands, size) == len(responses)
+			seconds = min(timeit.repeat(lambda: parse(stream, commands, size),
+					number=20, repeat=5)) / 20
+			print("%12s %10d %14.2f" % (name, size,
+					seconds / len(responses) * 1e6))
+
+if __name__ == '__main__':
+	main()
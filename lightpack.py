@@ -1,14 +1,18 @@
 from __future__ import print_function
-from past.builtins import basestring
 
+# Only modules which are cheap to import, or imported by Python at startup 
+# anyway, are imported here. Others, including threading and contextlib, are 
+# imported when first needed, so that `import lightpack` stays fast for 
+# short-lived scripts.
+import importlib
 import re
 import socket
-from boltons import socketutils
-from distutils.version import StrictVersion
+import time
+from collections import deque, namedtuple
 try:
-	from colour import Colour
-except ImportError:
-	Colour = None
+	basestring
+except NameError:
+	basestring = str
 
 NAME = 'py-lightpack'
 DESCRIPTION = "Library to control Lightpack"
@@ -18,9 +22,472 @@ URL = 'https://github.com/tremby/py-lightpack'
 VERSION = '2.2.0'
 LICENSE = "GNU GPLv3"
 
+_modules = {}
+
+def _optional(name):
+	"""
+	Import an optional module the first time it is needed.
+
+	:param name: module name
+	:type name: str
+	:returns: the module, or None if it isn't installed
+	"""
+	try:
+		return _modules[name]
+	except KeyError:
+		try:
+			module = importlib.import_module(name)
+		except ImportError:
+			module = None
+		_modules[name] = module
+		return module
+
+class _Version(tuple):
+	"""
+	API version number, comparable with others
+
+	A tuple of the major, minor and patch numbers, which prints like 
+	distutils' StrictVersion did.
+	"""
+
+	def __new__(cls, version):
+		"""
+		Parse a version number such as '2.2' or '1.4.1'.
+
+		Raises a ValueError if it isn't a valid version number.
+		"""
+		parts = str(version).split('.')
+		if not 1 <= len(parts) <= 3 or not all([p.isdigit() for p in parts]):
+			raise ValueError("invalid version number '%s'" % version)
+		return tuple.__new__(cls, ([int(p) for p in parts] + [0, 0])[:3])
+
+	def __str__(self):
+		if self[2] == 0:
+			return '%d.%d' % self[:2]
+		return '%d.%d.%d' % self
+
+	def __repr__(self):
+		return "_Version('%s')" % (str(self),)
+
 # Supported API version range
-API_VERSION_GTE = StrictVersion('1.4')
-API_VERSION_LTE = StrictVersion('2.2')
+API_VERSION_GTE = _Version('1.4')
+API_VERSION_LTE = _Version('2.2')
+
+# Methods which some supported API versions lack, with the first and last API 
+# versions which have them (None for no limit)
+API_COMMANDS = {
+	'getGamma': ('1.5', None),
+	'getSmoothness': ('1.5', None),
+	'getBrightness': ('1.5', None),
+	'getPersistence': ('2.2', None),
+	'getSoundVizColours': ('2.1', None),
+	'getSoundVizColors': ('2.1', None),
+	'getSoundVizLiquid': ('2.1', None),
+	'setDevice': (None, '1.5'),
+	'setCountLeds': (None, '1.5'),
+	'setSoundVizColour': ('2.1', None),
+	'setSoundVizColor': ('2.1', None),
+	'enableSoundVizLiquid': ('2.1', None),
+	'disableSoundVizLiquid': ('2.1', None),
+	'persist': ('2.2', None),
+	'unpersist': ('2.2', None),
+}
+
+# Commands whose last successful use is repeated after reconnecting, in the 
+# order they are repeated
+_RESTORED_COMMANDS = ('setprofile', 'setmode', 'setstatus', 'setbrightness',
+		'setgamma', 'setsmooth', 'setpersistonunlock')
+
+def _rgb(rgb):
+	"""
+	Get a tuple of red, green and blue values from a tuple, list or Colour 
+	object.
+
+	Colour objects are recognised by their rgb255 method, so that the colour 
+	package needn't be imported to check.
+	"""
+	if isinstance(rgb, tuple):
+		return rgb
+	rgb255 = getattr(rgb, 'rgb255', None)
+	return tuple(rgb255() if rgb255 is not None else rgb)
+
+class Greeting(namedtuple('Greeting', 'text version error')):
+	"""
+	Event for the server's greeting
+
+	`version` is the API version it reports, or None if it reports none, and 
+	`error` describes why the greeting isn't acceptable, or is None if it is.
+	"""
+
+class Response(namedtuple('Response', 'command text expected')):
+	"""
+	Event for a response to a command
+
+	`command` is the command as it was passed to `send()` (a str, or a 
+	bytearray for one already encoded), `text` the response without its trailing CRLF, 
+	and `expected` the response the command expects, or None to accept any. 
+	`command` is None for a response to no command.
+	"""
+
+	@property
+	def name(self):
+		"""
+		Part of the response before the first colon.
+		"""
+		return Protocol.name(self.text)
+
+	@property
+	def payload(self):
+		"""
+		Part of the response after the first colon, or None.
+		"""
+		return Protocol.payload(self.text)
+
+	@property
+	def failed(self):
+		"""
+		Whether the response isn't the one expected.
+		"""
+		return self.expected is not None and self.text != self.expected
+
+class Protocol:
+	"""
+	The Lightpack API's framing and parsing, without any I/O
+
+	A driver writes the bytes `send()` returns to the server, passes whatever 
+	it reads, in chunks of any size, to `receive()`, and takes events from 
+	`nextEvent()`: first a Greeting, then a Response to each command in the 
+	order the commands were sent. Nothing here touches a socket or blocks, so 
+	the same parser serves blocking sockets (as in `Lightpack`), asyncio (as 
+	in `AsyncLightpack`), selectors or trio, and can be benchmarked alone.
+
+	Use a new Protocol for each connection.
+	"""
+
+	def __init__(self):
+		self.greeting = None
+		self._buffer = bytearray()
+		self._start = 0
+		self._scanned = 0
+		self._pending = deque()
+
+	@property
+	def pending(self):
+		"""
+		Number of commands sent whose responses haven't been read.
+		"""
+		return len(self._pending)
+
+	@staticmethod
+	def encode(command):
+		"""
+		Encode a command for sending.
+
+		:param command: command without the trailing newline, or a bytearray 
+		already ending with one, which is returned as it is
+		:type command: str or bytearray
+		:returns: bytes or bytearray
+		"""
+		if isinstance(command, bytearray):
+			return command
+		return str.encode(command + '\n')
+
+	def send(self, command, expected_response=None):
+		"""
+		Encode a command for sending and await its response.
+
+		A bytearray is neither copied nor decoded, so mustn't be changed until 
+		its response is read.
+
+		:param command: command without the trailing newline, or a bytearray 
+		already ending with one
+		:type command: str or bytearray
+		:param expected_response: response expected, or None to accept any 
+		(default None)
+		:type expected_response: str
+		:returns: bytes to write
+		"""
+		self._pending.append((command, expected_response))
+		return self.encode(command)
+
+	def sendAll(self, commands):
+		"""
+		Encode several commands for sending in one write and await their 
+		responses.
+
+		:param commands: (command, expected_response) tuples, each as for 
+		`send()`
+		:type commands: list
+		:returns: bytes to write
+		"""
+		self._pending.extend(commands)
+		return b''.join([self.encode(command) for command, _ in commands])
+
+	def receive(self, data):
+		"""
+		Add data read from the server.
+
+		:param data: bytes read
+		:type data: bytes
+		"""
+		self._buffer += data
+
+	def nextEvent(self):
+		"""
+		Parse the next complete line received.
+
+		:returns: Greeting or Response, or None if more data is needed
+		"""
+		buffer = self._buffer
+		end = buffer.find(b'\r\n', max(self._start, self._scanned - 1))
+		if end < 0:
+			if self._start:
+				# Discard what has been parsed before reading more
+				del buffer[:self._start]
+				self._start = 0
+			self._scanned = len(buffer)
+			return None
+		text = buffer[self._start:end].decode('utf-8')
+		self._start = self._scanned = end + 2
+		if self._start == len(buffer):
+			del buffer[:]
+			self._start = self._scanned = 0
+		if self.greeting is None:
+			self.greeting = self.readGreeting(text)
+			return self.greeting
+		if self._pending:
+			command, expected = self._pending.popleft()
+		else:
+			command = expected = None
+		return Response(command, text, expected)
+
+	@staticmethod
+	def readGreeting(text):
+		"""
+		Read the server's greeting and check the API version it reports.
+
+		:param text: greeting line
+		:type text: str
+		:returns: Greeting
+		"""
+		match = re.findall(r'API v?(\d+(?:\.\d+)?)', text)
+		if not match:
+			return Greeting(text, None, "Unrecognized greeting from server: " \
+					"\"%s\"" % text)
+		match.sort(reverse=True)
+		version = _Version(match[0])
+		if version < API_VERSION_GTE or version > API_VERSION_LTE:
+			return Greeting(text, version, "API version (%s) is not " \
+					"supported" % (version,))
+		return Greeting(text, version, None)
+
+	@staticmethod
+	def _part(string, part):
+		"""
+		Get one part of a command or response -- the name or the payload.
+		"""
+		try:
+			return string.split(':', 1)[part]
+		except IndexError:
+			return None
+
+	@staticmethod
+	def name(string):
+		"""
+		Get the command name part of a command or response (the part before 
+		the first colon).
+		"""
+		return Protocol._part(string, 0)
+
+	@staticmethod
+	def payload(string):
+		"""
+		Get the payload part of a command or response (the part after the 
+		first colon).
+		"""
+		return Protocol._part(string, 1)
+
+	@staticmethod
+	def readList(payload):
+		"""
+		Read a semicolon-separated payload into a list of strings.
+		"""
+		return payload.rstrip(';').split(';')
+
+	@staticmethod
+	def readColour(snippet):
+		"""
+		Read a LED colour state snippet such as '1-255,0,0'.
+
+		:returns: Tuple with LED and tuple of red, green, blue values (0 to 
+		255)
+		"""
+		led, colours = snippet.split('-', 1)
+		rgb = [int(x) for x in colours.split(',', 2)]
+		return int(led), tuple(rgb)
+
+	@staticmethod
+	def readRectangle(snippet):
+		"""
+		Read a LED size state snippet such as '0-0,0,100,100'.
+
+		:returns: Tuple with LED and tuple of x-position, y-position, width 
+		and height
+		"""
+		led, coordinates = snippet.split('-', 1)
+		rectangle = [int(x) for x in coordinates.split(',', 3)]
+		return int(led), tuple(rectangle)
+
+	@staticmethod
+	def readValues(payload, width):
+		"""
+		Read a list of LED state snippets such as '1-255,0,0;2-0,0,0;' into a 
+		flat list of integers, the LED number then `width` values for each.
+
+		The whole payload is checked and converted in a few passes, each in C, 
+		rather than snippet by snippet: the separators left once the digits 
+		are deleted must be exactly those of one snippet after another, and 
+		then the numbers are read as one JSON list.
+
+		:param payload: semicolon-separated snippets
+		:type payload: str
+		:param width: number of values in each snippet after the LED number
+		:type width: int
+		:returns: list of integers, or None if the payload isn't well formed 
+		or needs reading snippet by snippet, such as with negative numbers, 
+		spaces or leading zeros
+		"""
+		import json
+		payload = payload.rstrip(';')
+		count = payload.count(';') + 1
+		# A hyphen other than each LED number's is a minus sign
+		if payload.count('-') != count or payload.translate(_DIGITS) != \
+				(('-' + ',' * (width - 1) + ';') * count)[:-1]:
+			return None
+		try:
+			return json.loads('[%s]' % payload.replace('-', ',').replace(';',
+					','))
+		except ValueError:
+			return None
+
+	@staticmethod
+	def readColours(payload):
+		"""
+		Read a getcolors payload into a dictionary of colours keyed by 1-based 
+		LED number.
+
+		Payloads which aren't well formed are read snippet by snippet, raising 
+		the same errors as `readColour`.
+
+		:returns: Dictionary of tuples of red, green, blue values (0 to 255)
+		"""
+		values = Protocol.readValues(payload, 3)
+		if values is None:
+			return dict([Protocol.readColour(snippet) \
+					for snippet in Protocol.readList(payload)])
+		return dict(zip(values[0::4], zip(values[1::4], values[2::4],
+				values[3::4])))
+
+	@staticmethod
+	def readRectangles(payload):
+		"""
+		Read a getleds payload into a dictionary of rectangles keyed by 
+		0-based LED number.
+
+		Payloads which aren't well formed are read snippet by snippet, raising 
+		the same errors as `readRectangle`.
+		"""
+		values = Protocol.readValues(payload, 4)
+		if values is None:
+			return dict([Protocol.readRectangle(snippet) \
+					for snippet in Protocol.readList(payload)])
+		return dict(zip(values[0::5], zip(values[1::5], values[2::5],
+				values[3::5], values[4::5])))
+
+# Fields of a Snapshot, with the method each is otherwise read with, the 
+# command that method sends and the function reading its payload
+_SNAPSHOT_FIELDS = (
+	('status', 'getStatus', 'getstatus', lambda payload: payload),
+	('mode', 'getMode', 'getmode', lambda payload: payload),
+	('profile', 'getProfile', 'getprofile', lambda payload: payload),
+	('profiles', 'getProfiles', 'getprofiles', Protocol.readList),
+	('fps', 'getFps', 'getfps', int),
+	('brightness', 'getBrightness', 'getbrightness', int),
+	('gamma', 'getGamma', 'getgamma', float),
+	('smoothness', 'getSmoothness', 'getsmooth', int),
+	('lockStatus', 'getLockStatus', 'getlockstatus', lambda payload: payload),
+	('apiStatus', 'getApiStatus', 'getstatusapi', lambda payload: payload),
+	('countLeds', 'getCountLeds', 'getcountleds', int),
+	('ledSizes', 'getLedSizes', 'getleds', Protocol.readRectangles),
+)
+
+def _contextManager(function):
+	"""
+	Decorator like `contextlib.contextmanager`, importing contextlib only when 
+	the context manager is first used.
+	"""
+	def contextManager(*args, **kwargs):
+		import contextlib
+		return contextlib.contextmanager(function)(*args, **kwargs)
+	contextManager.__name__ = function.__name__
+	contextManager.__doc__ = function.__doc__
+	return contextManager
+
+def _decimalTable(stop, suffix):
+	"""
+	Get a table of the ASCII decimal representations of the integers from 0 
+	to stop - 1, each followed by a suffix.
+
+	:param stop: first integer not in the table
+	:type stop: int
+	:param suffix: string to append to each number
+	:type suffix: str
+	:returns: dictionary of bytes, keyed by integer
+	"""
+	return dict([(i, ('%d%s' % (i, suffix)).encode('ascii')) \
+			for i in range(stop)])
+
+# Translation deleting ASCII digits, leaving the separators of a payload
+_DIGITS = dict.fromkeys(map(ord, '0123456789'))
+
+# Most precise clock available, for measuring latency
+_clock = getattr(time, 'perf_counter', time.time)
+
+# Byte strings used to encode colour commands without formatting each LED: 
+# LED prefixes, channels and last channels, built when first needed
+_encoderTables = None
+
+def _buildEncoderTables():
+	"""
+	Build the tables used by `Lightpack._encodeColours`.
+	"""
+	global _encoderTables
+	_encoderTables = (_decimalTable(1024, '-'), _decimalTable(256, ','),
+			_decimalTable(256, ';'))
+	return _encoderTables
+
+def _unsupportedCommands(version):
+	"""
+	Get functions raising the appropriate error for each method in 
+	API_COMMANDS which the given API version doesn't have.
+
+	:param version: API version
+	:type version: _Version
+	:returns: dictionary of functions, keyed by method name
+	"""
+	def raiser(error, method, limit):
+		def raiseError(*args, **kwargs):
+			raise error('%s()' % method, limit, version)
+		return raiseError
+	unsupported = {}
+	for method, (minimum, maximum) in API_COMMANDS.items():
+		if minimum is not None and version < _Version(minimum):
+			unsupported[method] = raiser(CommandNotSupportedError, method,
+					_Version(minimum))
+		elif maximum is not None and version > _Version(maximum):
+			unsupported[method] = raiser(CommandDeprecatedError, method,
+					_Version(maximum))
+	return unsupported
 
 class Lightpack:
 	"""
@@ -31,14 +498,42 @@ class Lightpack:
 	process or something else, and this information will be in the exception.
 
 	Commands that are not supported by your API version will raise either 
-	CommandNotSupportedError or CommandDeprecatedError, depending on the case.
+	CommandNotSupportedError or CommandDeprecatedError, depending on the case. 
+	Which methods are available is worked out once on connecting; see 
+	`capabilities`.
 
 	Colours passed to the setColour, setColourToAll and setColours methods as 
 	the `rgb` variable can be either a tuple of red, green and blue integers (in 
 	the 0 to 255 range) or [Colour](https://github.com/tremby/py-colour) objects.
+
+	If [NumPy](https://numpy.org/) is installed, the `*Array` methods take and 
+	return arrays and encode and decode them without a Python loop per LED.
+
+	With `reconnect` set, a dropped connection is reopened with jittered 
+	exponential backoff the next time a command fails. The API key, the lock, 
+	the last profile, mode, status, brightness, gamma, smoothness and 
+	persistence settings and the last colours sent are then restored in a 
+	single pipelined burst, and the command is retried. How long recoveries 
+	took is kept in `recoveryStats`.
+
+	When other clients may hold the lock, `acquireLock()` and `locked()` wait 
+	for it rather than failing; see `LockManager`. How long waits took is kept 
+	in `lockStats`.
 	"""
 
-	def __init__(self, host='localhost', port=3636, led_map=None, api_key=None):
+	# Seconds to wait before the second attempt to reconnect, doubling for each 
+	# later attempt up to the maximum
+	reconnectDelay = 0.05
+	reconnectMaxDelay = 2.0
+
+	# Seconds to wait for a response before raising socket.timeout, and the 
+	# most bytes to read from the connection at once
+	timeout = 10.0
+	readSize = 65536
+
+	def __init__(self, host='localhost', port=3636, led_map=None, api_key=None,
+			colour_ttl=0, led_groups=None, reconnect=False,
+			reconnect_timeout=10.0, cache_ttl=None):
 		"""
 		Create a lightpack object.
 
@@ -50,21 +545,62 @@ class Lightpack:
 		:type led_map: list
 		:param api_key: API key (password) to provide (default None)
 		:type api_key: str
-		"""
+		:param colour_ttl: seconds for which colours read from the Lightpack 
+		may be reused by `getColour` and friends (default 0 -- always read)
+		:type colour_ttl: float
+		:param led_groups: Dictionary of aliases for groups of LEDs, each a 
+		list of LED indices or aliases, or a range (default None -- no groups)
+		:type led_groups: dict
+		:param reconnect: reconnect and restore state automatically if the 
+		connection drops (default False)
+		:type reconnect: boolean
+		:param reconnect_timeout: seconds to keep trying to reconnect before 
+		raising a CannotConnectError (default 10)
+		:type reconnect_timeout: float
+		:param cache_ttl: seconds for which metadata such as the LED count and 
+		sizes is cached for getters called with fresh=False (default None -- 
+		until a setter changes it); see `cache`
+		:type cache_ttl: float
+		"""
+		self._ledMap = None
+		self._ledGroups = None
+		self._index = None
 		self.host = host
 		self.port = port
 		self.led_map = led_map
+		self.led_groups = led_groups
 		self.api_key = api_key
+		self.cache = MetadataCache(cache_ttl)
+		self.colour_ttl = colour_ttl
 		self.connection = None
+		self._protocol = None
 		self._apiVersion = None
-		self._countLeds = None
-		self._countMonitors = None
-		self._devices = []
-		self._ledSizes = []
-		self._maxLeds = None
-		self._monitor = {}
-		self._profiles = []
-		self._screenSize = None
+		self._capabilities = {}
+		self._pipeline = None
+		self._frame = {}
+		self._framesPushed = 0
+		self._buffer = bytearray()
+		self._observers = []
+		self.reconnect = reconnect
+		self.reconnect_timeout = reconnect_timeout
+		self._locked = False
+		self._settings = {}
+		self.recoveryStats = {'recoveries': 0, 'attempts': 0, 'failures': 0,
+				'last': None, 'max': 0.0, 'total': 0.0}
+		self._lockManager = None
+		self.lockStats = {'acquisitions': 0, 'attempts': 0, 'timeouts': 0,
+				'last': None, 'max': 0.0, 'total': 0.0}
+
+	@property
+	def colour_ttl(self):
+		"""
+		Seconds for which colours read from the Lightpack may be reused.
+		"""
+		return self.cache.ttls['colours']
+
+	@colour_ttl.setter
+	def colour_ttl(self, colour_ttl):
+		self.cache.ttls['colours'] = colour_ttl
 
 	def getApiVersion(self):
 		"""
@@ -74,6 +610,119 @@ class Lightpack:
 		"""
 		return str(self._apiVersion)
 
+	@property
+	def capabilities(self):
+		"""
+		Whether each method in API_COMMANDS is supported by the connected 
+		Lightpack's API version.
+
+		Empty until connected.
+
+		:returns: dictionary of booleans, keyed by method name
+		"""
+		return dict(self._capabilities)
+
+	def _resolveCapabilities(self):
+		"""
+		Replace the methods the API version doesn't support with ones raising 
+		the appropriate error, so that supported methods needn't check.
+		"""
+		for method in API_COMMANDS:
+			self.__dict__.pop(method, None)
+		unsupported = _unsupportedCommands(self._apiVersion)
+		self.__dict__.update(unsupported)
+		self._capabilities = dict([(method, method not in unsupported) \
+				for method in API_COMMANDS])
+
+	@property
+	def led_map(self):
+		"""
+		List of aliases for the LEDs in order.
+
+		Assign a new list rather than modifying it in place, so that the LED 
+		index is rebuilt.
+		"""
+		return self._ledMap
+
+	@led_map.setter
+	def led_map(self, led_map):
+		self._ledMap = led_map
+		self._index = None
+
+	@property
+	def led_groups(self):
+		"""
+		Dictionary of aliases for groups of LEDs.
+
+		Assign a new dictionary rather than modifying it in place, so that the 
+		LED index is rebuilt.
+		"""
+		return self._ledGroups
+
+	@led_groups.setter
+	def led_groups(self, led_groups):
+		self._ledGroups = led_groups
+		self._index = None
+
+	def _ledIndexMap(self):
+		"""
+		Get the dictionary mapping each LED index, alias and group alias to 
+		its 1-based LED indices.
+
+		It is built when first needed and rebuilt only after the aliases, 
+		groups or LED count change.
+
+		:returns: dictionary of tuples of 1-based LED indices
+		"""
+		if self._index is None:
+			count = self.getCountLeds(fresh=False)
+			index = dict([(led, (led + 1,)) for led in range(count)])
+			for led, alias in enumerate(self._ledMap or []):
+				index[alias] = (led + 1,)
+			for alias, leds in (self._ledGroups or {}).items():
+				indices = []
+				for led in leds:
+					try:
+						indices.extend(index[led])
+					except KeyError:
+						self._ledIndexError(led, count)
+				index[alias] = tuple(indices)
+			self._index = index
+		return self._index
+
+	def _ledIndexError(self, led, count):
+		"""
+		Raise the appropriate error for an LED which can't be resolved.
+
+		Raises an AliasDoesNotExistError if a given alias cannot be found.
+		Raises an IndexError if an LED index is out of bounds.
+		"""
+		if isinstance(led, basestring):
+			if not self._ledMap and not self._ledGroups:
+				raise AliasDoesNotExistError("There are no aliases defined, " \
+						"so can't resolve LED \"%s\"" % led)
+			raise AliasDoesNotExistError("Alias \"%s\" isn't defined" % led)
+		raise IndexError("LED (zero-)index %s out of range " \
+				"(only %d LEDs are connected)" % (led, count))
+
+	def _ledIndices(self, led):
+		"""
+		Get the indices of the given LED or group of LEDs.
+
+		:param led: 0-based LED index or its preconfigured alias or group alias
+		:type led: str or int
+
+		Raises an AliasDoesNotExistError if a given alias cannot be found.
+		Raises an IndexError if an LED index is out of bounds.
+
+		:returns: tuple of 1-based LED indices
+		"""
+		index = self._ledIndexMap()
+		try:
+			return index[led]
+		except (KeyError, TypeError):
+			self._ledIndexError(led, self.cache.peek('countLeds'))
+
 	def _ledIndex(self, led):
 		"""
 		Get the index of the given LED (by alias or index).
@@ -83,64 +732,78 @@ class Lightpack:
 
 		Raises an AliasDoesNotExistError if a given alias cannot be found.
 		Raises an IndexError if an LED index is out of bounds.
+		Raises a ValueError if given a group alias.
 
 		:returns: 1-based LED index
 		"""
-		if isinstance(led, basestring):
-			try:
-				return self.led_map.index(led) + 1
-			except AttributeError:
-				raise AliasDoesNotExistError("There are no aliases defined, " \
-						"so can't resolve LED \"%s\"" % led)
-			except ValueError:
-				raise AliasDoesNotExistError("Alias \"%s\" isn't defined" % led)
-		index = led + 1
-		count = self.getCountLeds(fresh=False)
-		if index > count:
-			raise IndexError("LED (zero-)index %d out of range " \
-					"(only %d LEDs are connected)" % (led, count))
-		return index
+		indices = self._ledIndices(led)
+		if len(indices) != 1:
+			raise ValueError("\"%s\" is a group of %d LEDs, not a single LED" \
+					% (led, len(indices)))
+		return indices[0]
 
-	def _readResult(self):
+	def _readEvent(self):
 		"""
-		Return API response to most recent command.
+		Read until the protocol has parsed the next greeting or response.
 
-		This is called in every local method.
-		"""
-		data = self.connection.recv_until('\r\n'.encode('utf-8'))
-		return data.decode('utf-8')
+		This is called in every local method. The connection is read in large 
+		chunks, which the protocol splits into responses.
 
-	def _commandPart(self, string, part):
-		"""
-		Get one part of a command or response -- the name or the payload.
+		:returns: Greeting or Response
 		"""
-		try:
-			return string.split(':', 1)[part]
-		except IndexError:
-			return None
+		protocol = self._protocol
+		event = protocol.nextEvent()
+		while event is None:
+			data = self.connection.recv(self.readSize)
+			if not data:
+				raise socket.error("Connection closed by Lightpack")
+			protocol.receive(data)
+			event = protocol.nextEvent()
+		return event
 
 	def _name(self, string):
 		"""
 		Get the command name part of a command or response (the part before the 
 		first colon).
 		"""
-		return self._commandPart(string, 0)
+		return Protocol.name(string)
 
 	def _payload(self, string):
 		"""
 		Get the payload part of a command or response (the part after the first 
 		colon).
 		"""
-		return self._commandPart(string, 1)
+		return Protocol.payload(string)
+
+	def _write(self, data):
+		"""
+		Write bytes encoded by the protocol to the connection.
+		"""
+		self.connection.sendall(data)
 
-	def _send(self, command):
+	def _send(self, command, expected_response=None):
 		"""
 		Send a command.
 
+		A bytearray, as built by `_encodeColours`, is sent as it is without 
+		being copied, so must already end with a newline.
+
 		:param command: command to send, without the trailing newline
-		:type command: str
+		:type command: str or bytearray
+		:param expected_response: response expected, or None to accept any 
+		(default None)
+		:type expected_response: str
+		"""
+		self._write(self._protocol.send(command, expected_response))
+
+	def _sendAll(self, commands):
+		"""
+		Send several commands in one write.
+
+		:param commands: (command, expected_response) tuples
+		:type commands: list
 		"""
-		self.connection.send(str.encode(command + '\n'))
+		self._write(self._protocol.sendAll(commands))
 
 	def _sendAndReceive(self, command):
 		"""
@@ -150,8 +813,111 @@ class Lightpack:
 		:type command: str
 		:returns: string response
 		"""
-		self._send(command)
-		return self._readResult()
+		if self._pipeline is not None:
+			return self._pipeline.flush(command)
+		return self._request(command).text
+
+	def _request(self, command, expected_response=None):
+		"""
+		Send a command and read the response event.
+
+		:param command: command to send
+		:type command: str or bytearray
+		:param expected_response: response expected, or None to accept any 
+		(default None)
+		:type expected_response: str
+		:returns: Response
+		"""
+		if self.reconnect:
+			return self._requestResilient(command, expected_response)
+		if self._observers:
+			return self._requestObserved(command, expected_response)
+		self._send(command, expected_response)
+		return self._readEvent()
+
+	def _requestResilient(self, command, expected_response):
+		"""
+		Send a command and read the response event, reconnecting and sending 
+		it again if the connection has dropped.
+		"""
+		try:
+			return self._requestObserved(command, expected_response) \
+					if self._observers else self._requestOnce(command,
+					expected_response)
+		except socket.error:
+			if isinstance(command, bytearray):
+				# Restoring the colours reuses the encoder's buffer
+				command = bytearray(command)
+			self._recover()
+			return self._requestObserved(command, expected_response) \
+					if self._observers else self._requestOnce(command,
+					expected_response)
+
+	def _requestOnce(self, command, expected_response):
+		"""
+		Send a command and read the response event, without observers or 
+		reconnecting.
+		"""
+		self._send(command, expected_response)
+		return self._readEvent()
+
+	def _requestObserved(self, command, expected_response):
+		"""
+		Send a command and read the response event, reporting the exchange to 
+		the observers.
+		"""
+		start = _clock()
+		self._send(command, expected_response)
+		response = self._readEvent()
+		self._notify([(command, response.text)], _clock() - start)
+		return response
+
+	def _notify(self, exchanges, seconds):
+		"""
+		Report commands and their responses to the observers.
+
+		:param exchanges: list of (command, response) tuples
+		:type exchanges: list
+		:param seconds: time from sending the commands to reading the last 
+		response
+		:type seconds: float
+		"""
+		for command, response in exchanges:
+			if isinstance(command, bytearray):
+				name = command[:command.find(b':')].decode('ascii')
+				sent = len(command)
+			else:
+				name = self._name(command)
+				sent = len(command) + 1
+			for observer in self._observers:
+				observer(name, sent, len(response) + 2, seconds)
+
+	def addObserver(self, observer):
+		"""
+		Report every command sent to an observer.
+
+		The observer is called after each command's response is read, with 
+		the command name, the numbers of bytes sent and received, and the 
+		round trip time in seconds. Commands sent in one pipeline all report 
+		the time taken by the whole pipeline. See CommandStats for an observer 
+		collecting statistics.
+
+		While there are no observers, commands aren't timed at all.
+
+		:param observer: function taking name, bytes_sent, bytes_received and 
+		seconds arguments
+		:type observer: callable
+		"""
+		self._observers.append(observer)
+
+	def removeObserver(self, observer):
+		"""
+		Stop reporting commands to an observer.
+
+		:param observer: observer previously passed to `addObserver`
+		:type observer: callable
+		"""
+		self._observers.remove(observer)
 
 	def _sendAndReceivePayload(self, command):
 		"""
@@ -173,10 +939,32 @@ class Lightpack:
 		:param expected_response: expected response
 		:type expected_response: str
 		"""
-		response = self._sendAndReceive(command)
-		if response == expected_response:
+		if self._pipeline is not None:
+			if isinstance(command, bytearray):
+				command = command[:-1].decode('ascii')
+			# Remembered by the pipeline once the response shows it worked
+			self._pipeline.queue(command, expected_response)
+			return
+		response = self._request(command, expected_response)
+		if not response.failed:
+			self._remember(command)
 			return
-		raise CommandFailedError(command, response, expected_response)
+		if isinstance(command, bytearray):
+			command = command[:-1].decode('ascii')
+		raise CommandFailedError(command, response.text, expected_response)
+
+	def _remember(self, command):
+		"""
+		Remember a command to repeat after reconnecting, if it is one of 
+		_RESTORED_COMMANDS and reconnecting is enabled.
+
+		:param command: command sent
+		:type command: str or bytearray
+		"""
+		if self.reconnect and not isinstance(command, bytearray):
+			name = self._name(command)
+			if name in _RESTORED_COMMANDS:
+				self._settings[name] = command
 
 	def _sendAndExpectOk(self, command):
 		"""
@@ -197,6 +985,27 @@ class Lightpack:
 		"""
 		self._sendAndExpect(command, '%s:success' % self._name(command))
 
+	def pipeline(self):
+		"""
+		Start queueing commands so they are sent in a single round trip.
+
+		Use the returned object as a context manager. Commands which only 
+		expect an acknowledgement (`setColours`, `setBrightness`, `lock` and so 
+		on) are queued rather than sent, and when the block exits all of them 
+		are written at once and their responses are read back in order. A 
+		CommandFailedError is raised for the first command which failed.
+
+		Methods which return a value may still be called inside the block; 
+		they flush the queue along with their own command, so they cost a 
+		single round trip too.
+
+		If an exception is raised inside the block the queued commands are 
+		discarded.
+
+		:returns: Pipeline object
+		"""
+		return Pipeline(self)
+
 	def getColour(self, led):
 		"""
 		Get the specified LED's colour.
@@ -205,7 +1014,7 @@ class Lightpack:
 		:type led: str or int
 		:returns: Tuple of red, green, blue values (0 to 255)
 		"""
-		return self.getColoursFromAll()[self._ledIndex(led)]
+		return self._colourSnapshot()[self._ledIndex(led)]
 	getColor = getColour
 
 	def getColours(self, *args):
@@ -215,11 +1024,27 @@ class Lightpack:
 		:returns: Dictionary of tuples of red, green, blue values (0 to 
 		255), using LED numbers as integer keys
 		"""
-		defs = [self._ledIndex(arg) for arg in args]
-		colours = self.getColoursFromAll()
-		return dict([(k, colours[k]) for k in colours if k in defs])
+		colours = self._colourSnapshot()
+		return dict([(k, colours[k]) for arg in args \
+				for k in self._ledIndices(arg) if k in colours])
 	getColors = getColours
 
+	def _colourSnapshot(self, fresh=False):
+		"""
+		Get the colours of all LEDs, reusing the last ones read if they are 
+		younger than `colour_ttl` seconds.
+
+		Setting colours discards the snapshot. The returned dictionary is 
+		shared, so must not be modified.
+
+		:param fresh: read new colours regardless of age
+		:type fresh: boolean
+		:returns: Dictionary of tuples of red, green, blue values, using LED 
+		numbers as integer keys
+		"""
+		return self.cache.get('colours', lambda: Protocol.readColours(
+				self._sendAndReceivePayload('getcolors')), fresh)
+
 	def _ledColourRead(self, snippet):
 		"""
 		Read a LED colour state snippet into RGB Tuple.
@@ -229,26 +1054,36 @@ class Lightpack:
 		:returns: Tuple with LED and tuple of red, green, blue values (0 to 
 		255)
 		"""
-		led, colours = snippet.split('-', 1)
-		rgb = [int(x) for x in colours.split(',', 2)]
-		return int(led), tuple(rgb)
+		return Protocol.readColour(snippet)
 
-	def getColoursFromAll(self):
+	def getColoursFromAll(self, fresh=True):
 		"""
 		Get the colours for all LEDs.
 
+		If the parameter fresh (default True) is set to False, colours read 
+		less than `colour_ttl` seconds ago will be used if available.
+
+		:param fresh: fetch new values or use cached response
+		:type fresh: boolean
 		:returns: Dictionary of tuples of red, green, blue values (0 to 
 		255), using LED numbers as integer keys
 		"""
-		commands = self._sendAndReceivePayload('getcolors').rstrip(';')\
-			.split(';')
-		colours = {}
-		for command in commands:
-			data = self._ledColourRead(command)
-			colours[data[0]] = data[1]
-		return colours
+		return dict(self._colourSnapshot(fresh))
 	getColorsFromAll = getColoursFromAll
 
+	def getColoursArray(self):
+		"""
+		Get the colours for all LEDs as an array.
+
+		If NumPy is not available a list of tuples is returned instead.
+
+		:returns: (N, 3) uint8 array of red, green, blue values, one row per 
+		LED in order
+		"""
+		return self._readArray(self._sendAndReceivePayload('getcolors'), 3,
+				'uint8')
+	getColorsArray = getColoursArray
+
 	def getColourAverage(self):
 		"""
 		Get the average colour of all LEDs.
@@ -257,7 +1092,7 @@ class Lightpack:
 		"""
 		try:
 			r = g = b = 0
-			colours = self.getColoursFromAll()
+			colours = self._colourSnapshot()
 			for k in colours:
 				r += colours[k][0]
 				g += colours[k][1]
@@ -279,10 +1114,6 @@ class Lightpack:
 
 		:returns: float
 		"""
-		api_version_min = StrictVersion('1.5')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('getGamma()', api_version_min,
-					self._apiVersion)
 		return float(self._sendAndReceivePayload('getgamma'))
 
 	def getSmoothness(self):
@@ -295,10 +1126,6 @@ class Lightpack:
 
 		:returns: integer
 		"""
-		api_version_min = StrictVersion('1.5')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('getSmoothness()', api_version_min,
-					self._apiVersion)
 		return int(self._sendAndReceivePayload('getsmooth'))
 
 	def getBrightness(self):
@@ -311,10 +1138,6 @@ class Lightpack:
 
 		:returns: integer
 		"""
-		api_version_min = StrictVersion('1.5')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('getBrightness()', api_version_min,
-					self._apiVersion)
 		return int(self._sendAndReceivePayload('getbrightness'))
 
 	def getDevice(self):
@@ -336,10 +1159,8 @@ class Lightpack:
 		:type fresh: boolean
 		:returns: list of strings
 		"""
-		if fresh or self._devices == []:
-			self._devices = self._sendAndReceivePayload('getdevices').rstrip(
-				';').split(';')
-		return self._devices
+		return self.cache.get('devices', lambda: Protocol.readList(
+				self._sendAndReceivePayload('getdevices')), fresh)
 
 	def getFps(self):
 		"""
@@ -367,10 +1188,6 @@ class Lightpack:
 
 		:returns: string, 'on', 'off', possibly others
 		"""
-		api_version_min = StrictVersion('2.2')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('getPersistence()', api_version_min,
-					self._apiVersion)
 		return self._sendAndReceivePayload('getpersistonunlock')
 
 	def getProfiles(self, fresh=True):
@@ -384,10 +1201,8 @@ class Lightpack:
 		:type fresh: boolean
 		:returns: list of strings
 		"""
-		if fresh or self._profiles == []:
-			self._profiles = self._sendAndReceivePayload('getprofiles').rstrip(
-				';').split(';')
-		return self._profiles
+		return self.cache.get('profiles', lambda: Protocol.readList(
+				self._sendAndReceivePayload('getprofiles')), fresh)
 
 	def getProfile(self):
 		"""
@@ -408,17 +1223,16 @@ class Lightpack:
 		:type fresh: boolean
 		:returns: tuple of x-position, y-position, width and height
 		"""
-		if fresh or self._screenSize is None:
+		def fetch():
 			try:
 				coordinates = self._sendAndReceivePayload(
 					'getscreensize').split(',', 3)
-				rectangle = [int(x) for x in coordinates if x.strip()]
-				self._screenSize = tuple(rectangle)
+				return tuple([int(x) for x in coordinates if x.strip()])
 			except AttributeError:
 				return None
 			except ValueError:
 				return None
-		return self._screenSize
+		return self.cache.get('screenSize', fetch, fresh)
 
 	def getStatus(self):
 		"""
@@ -439,9 +1253,12 @@ class Lightpack:
 		:type fresh: boolean
 		:returns: integer
 		"""
-		if fresh or self._countLeds is None:
-			self._countLeds = int(self._sendAndReceivePayload('getcountleds'))
-		return self._countLeds
+		previous = self.cache.peek('countLeds')
+		count = self.cache.get('countLeds', lambda: int(
+				self._sendAndReceivePayload('getcountleds')), fresh)
+		if count != previous:
+			self._index = None
+		return count
 
 	def getMaxLeds(self, fresh=True):
 		"""
@@ -454,9 +1271,8 @@ class Lightpack:
 		:type fresh: boolean
 		:returns: integer
 		"""
-		if fresh or self._maxLeds is None:
-			self._maxLeds = int(self._sendAndReceivePayload('getmaxleds'))
-		return self._maxLeds
+		return self.cache.get('maxLeds', lambda: int(
+				self._sendAndReceivePayload('getmaxleds')), fresh)
 
 	def _ledSizeRead(self, command):
 		"""
@@ -466,9 +1282,66 @@ class Lightpack:
 		:type command: str
 		:returns: Tuple with LED and tuple of x0, y0, x1, y1.
 		"""
-		led, coordinates = command.split('-', 1)
-		rectangle = [int(x) for x in coordinates.split(',', 3)]
-		return int(led), tuple(rectangle)
+		return Protocol.readRectangle(command)
+
+	def _readArray(self, payload, width, dtype):
+		"""
+		Read a list of LED state snippets into an array.
+
+		Rows are ordered by LED number. If NumPy is not available a list of 
+		tuples is returned instead.
+
+		:param payload: semicolon-separated snippets such as '1-0,0,0;'
+		:type payload: str
+		:param width: number of values in each snippet after the LED number
+		:type width: int
+		:param dtype: NumPy data type of the returned array
+		:type dtype: str
+		:returns: (N, width) array
+		"""
+		numpy = _optional('numpy')
+		values = Protocol.readValues(payload, width)
+		if numpy is None or values is None:
+			# Only the hyphen after each LED number is a separator; others, as 
+			# in '1--1920,0,100,100', are minus signs
+			rows = []
+			for command in payload.rstrip(';').split(';'):
+				led, values = command.split('-', 1)
+				rows.append((int(led), tuple([int(x) for x in values.split(',')])))
+			rows = [row for _, row in sorted(rows)]
+			if numpy is None:
+				return rows
+			return numpy.array(rows, dtype=dtype).reshape(-1, width)
+		values = numpy.array(values, dtype=numpy.int64).reshape(-1, width + 1)
+		values = values[values[:, 0].argsort()]
+		return values[:, 1:].astype(dtype)
+
+	def _writeArray(self, array, width):
+		"""
+		Get the command payload setting LEDs 0 onwards from an array.
+
+		:param array: (N, width) array or list of tuples
+		:param width: number of values for each LED
+		:type width: int
+		:returns: string payload
+		"""
+		numpy = _optional('numpy')
+		count = len(array)
+		if count > self.getCountLeds(fresh=False):
+			raise IndexError("%d LEDs given but only %d are connected" % (
+					count, self.getCountLeds(fresh=False)))
+		if numpy is None:
+			values = []
+			for index, row in enumerate(array):
+				values.append(index + 1)
+				values.extend(row)
+		else:
+			table = numpy.empty((count, width + 1), dtype=numpy.int64)
+			table[:, 0] = numpy.arange(1, count + 1)
+			table[:, 1:] = array
+			values = table.ravel().tolist()
+		snippet = '%d-' + ','.join(['%d'] * width)
+		return ';'.join([snippet] * count) % tuple(values)
 
 	def getLedSizes(self, fresh=True):
 		"""
@@ -482,14 +1355,20 @@ class Lightpack:
 		:returns: Dictionary of tuples of x-position, y-position, height and
 		width, using 0-based LED numbers as keys
 		"""
-		if fresh or self._ledSizes == {}:
-			commands = self._sendAndReceivePayload('getleds').rstrip(';') \
-				.split(';')
-			self._ledSizes = {}
-			for command in commands:
-				data = self._ledSizeRead(command)
-				self._ledSizes[data[0]] = data[1]
-		return self._ledSizes
+		return self.cache.get('ledSizes', lambda: Protocol.readRectangles(
+				self._sendAndReceivePayload('getleds')), fresh)
+
+	def getLedSizesArray(self):
+		"""
+		Get the dimensions of all LEDs as an array.
+
+		If NumPy is not available a list of tuples is returned instead.
+
+		:returns: (N, 4) int32 array of x-position, y-position, width and 
+		height, one row per LED in order
+		"""
+		return self._readArray(self._sendAndReceivePayload('getleds'), 4,
+				'int32')
 
 	def getSoundVizColours(self):
 		"""
@@ -501,10 +1380,6 @@ class Lightpack:
 
 		:returns: Tuple of two rgb tuples.
 		"""
-		api_version_min = StrictVersion('2.1')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('getSoundVizColours()', api_version_min,
-					self._apiVersion)
 		try:
 			command = self._sendAndReceivePayload('getsoundvizcolors')
 			parts = command.split(';', 1)
@@ -529,10 +1404,6 @@ class Lightpack:
 
 		:returns: string, 'ok' or 'no'.
 		"""
-		api_version_min = StrictVersion('2.1')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('getSoundVizLiquid()', api_version_min,
-					self._apiVersion)
 		return ('no', 'ok')[bool(self._sendAndReceivePayload(
 			'getsoundvizliquid'))]
 
@@ -547,9 +1418,8 @@ class Lightpack:
 		:type fresh: boolean
 		:returns: integer
 		"""
-		if fresh or self._countMonitors is None:
-			self._countMonitors = int(self._sendAndReceivePayload('countmonitors'))
-		return self._countMonitors
+		return self.cache.get('countMonitors', lambda: int(
+				self._sendAndReceivePayload('countmonitors')), fresh)
 
 	def getMonitorSize(self, monitor, fresh=True):
 		"""
@@ -564,16 +1434,15 @@ class Lightpack:
 		:type fresh: boolean
 		:returns: tuple of x-position, y-position, width and height
 		"""
-		if fresh or self._monitor == {} or monitor not in self._monitor:
+		def fetch():
 			try:
 				response = self._sendAndReceivePayload('getsizemonitor:%s' %
 													   monitor)
 				coordinates = response.split(',', 3)
-				rectangle = [int(x) for x in coordinates if x.strip()]
-				self._monitor[monitor] = tuple(rectangle)
+				return tuple([int(x) for x in coordinates if x.strip()])
 			except AttributeError:
 				return None
-		return self._monitor[monitor]
+		return self.cache.get('monitorSize', fetch, fresh, monitor)
 
 	def getLockStatus(self):
 		"""
@@ -591,10 +1460,62 @@ class Lightpack:
 		"""
 		return self._sendAndReceivePayload('getstatusapi')
 
+	def getSnapshot(self):
+		"""
+		Get the state of the Lightpack, sending every getter at once.
+
+		The status, mode, profile and profile list, frame rate, brightness, 
+		gamma, smoothness, lock and API status, LED count and LED sizes are 
+		all read in a single round trip. Fields the API version doesn't 
+		support are None.
+
+		:returns: Snapshot
+		"""
+		fields = [field for field in _SNAPSHOT_FIELDS \
+				if self._capabilities.get(field[1], True)]
+		responses = self._sendAndReceiveAll([field[2] for field in fields])
+		values = dict([(field[0], field[3](self._payload(response))) \
+				for field, response in zip(fields, responses)])
+		if values['countLeds'] != self.cache.peek('countLeds'):
+			self._index = None
+		for name in ('countLeds', 'profiles', 'ledSizes'):
+			self.cache.set(name, values[name])
+		return Snapshot.fromValues(values)
+
+	def _sendAndReceiveAll(self, commands):
+		"""
+		Send several commands in one round trip and get all the responses.
+
+		Any commands queued in an active pipeline are sent first.
+
+		:param commands: commands to send
+		:type commands: list
+		:returns: list of string responses
+		"""
+		if self._pipeline is not None:
+			return self._pipeline.flushAll(commands)
+		return Pipeline(self).flushAll(commands)
+
 	def connect(self):
 		"""
 		Connect to the Lightpack API.
 
+		A CannotConnectError is raised on failure.
+		"""
+		self._open()
+
+		# Give API key if we have one
+		if self.api_key is not None:
+			response = self._sendAndReceive('apikey:%s' % self.api_key)
+			if response != 'ok':
+				raise CannotConnectError("Could not connect to %s:%d (with " \
+						"an API key)" % (self.host, self.port),
+						"bad API key (server responded '%s')" % response)
+
+	def _open(self):
+		"""
+		Open the connection, read the greeting and check the API version.
+
 		A CannotConnectError is raised on failure.
 		"""
 
@@ -608,53 +1529,162 @@ class Lightpack:
 
 		# Attempt to connect
 		try:
-			connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-			connection.connect((self.host, self.port))
-			self.connection = socketutils.BufferedSocket(connection)
-			greeting = self._readResult()
+			self._protocol = Protocol()
+			self.connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+			self.connection.connect((self.host, self.port))
+			self.connection.settimeout(self.timeout)
+			self._readEvent()
 		except Exception as e:
 			fail(e)
 
 		# Check greeting and reported API version
-		match = re.findall(r'API v?(\d+(?:\.\d+)?)', greeting)
-		if match:
-			match.sort(reverse=True)
-			self._apiVersion = StrictVersion(match[0])
-			if self._apiVersion < API_VERSION_GTE or self._apiVersion > \
-					API_VERSION_LTE:
-				fail("API version (%s) is not supported" % self._apiVersion)
-		else:
-			fail("Unrecognized greeting from server: \"%s\"" % greeting)
-
-		# Give API key if we have one
+		greeting = self._protocol.greeting
+		self._apiVersion = greeting.version
+		if greeting.error is not None:
+			fail(greeting.error)
+		self._resolveCapabilities()
+
+	def _recover(self):
+		"""
+		Reconnect after the connection has dropped and restore the session.
+
+		Attempts are retried with jittered exponential backoff until 
+		`reconnect_timeout` runs out, when a CannotConnectError is raised.
+		"""
+		import random
+		start = _clock()
+		delay = self.reconnectDelay
+		stats = self.recoveryStats
+		while True:
+			stats['attempts'] += 1
+			# Failures while restoring are retried here, not recovered from
+			self.reconnect = False
+			try:
+				self._restore()
+				break
+			except (socket.error, CannotConnectError, CommandFailedError) as e:
+				wait = delay / 2 + random.uniform(0, delay / 2)
+				if _clock() - start + wait > self.reconnect_timeout:
+					stats['failures'] += 1
+					raise CannotConnectError("Could not reconnect to %s:%d " \
+							"within %ss" % (self.host, self.port,
+							self.reconnect_timeout), e)
+				time.sleep(wait)
+				delay = min(delay * 2, self.reconnectMaxDelay)
+			finally:
+				self.reconnect = True
+		seconds = _clock() - start
+		stats['recoveries'] += 1
+		stats['last'] = seconds
+		stats['max'] = max(stats['max'], seconds)
+		stats['total'] += seconds
+
+	def _restore(self):
+		"""
+		Open a new connection and send the API key, lock, settings and last 
+		colours in one pipeline.
+		"""
+		try:
+			self.connection.close()
+		except Exception:
+			pass
+		self.cache.invalidate('colours')
+		self._open()
+		pipeline = Pipeline(self)
 		if self.api_key is not None:
-			response = self._sendAndReceive('apikey:%s' % self.api_key)
-			if response != 'ok':
-				fail("bad API key (server responded '%s')" % response)
+			pipeline.queue('apikey:%s' % self.api_key, 'ok')
+		if self._locked:
+			pipeline.queue('lock', 'lock:success')
+			for name in _RESTORED_COMMANDS:
+				if name in self._settings:
+					pipeline.queue(self._settings[name], 'ok')
+			if self._frame:
+				command = self._encodeColours(sorted(self._frame.items()))
+				pipeline.queue(command[:-1].decode('ascii'), 'ok')
+		# A failed attempt is retried, so mustn't lose the colours to restore
+		pipeline._flush(forget=False)
+
+	def _resolveColours(self, pairs):
+		"""
+		Resolve LEDs, aliases and group aliases to 1-based indices.
+
+		:param pairs: iterable of (led, rgb) tuples, where rgb may be a Colour
+		:returns: list of (index, rgb tuple) tuples
+		"""
+		index = self._ledIndexMap()
+		resolved = []
+		for led, rgb in pairs:
+			rgb = _rgb(rgb)
+			try:
+				indices = index[led]
+			except (KeyError, TypeError):
+				self._ledIndexError(led, self.cache.peek('countLeds'))
+			resolved.extend([(i, rgb) for i in indices])
+		return resolved
+
+	def _encodeColours(self, pairs):
+		"""
+		Encode a command setting 1-based LED indices to colours, and remember 
+		the colours as the last sent.
+
+		The command is written into a buffer which is reused by the next call, 
+		from tables of the encoded numbers. Values outside the tables fall 
+		back to string formatting.
+
+		:param pairs: list of (index, rgb tuple) tuples
+		:returns: bytearray holding the command and its trailing newline
+		"""
+		self._frame.update(pairs)
+		self.cache.invalidate('colours')
+		prefixes, channels, lastChannels = _encoderTables or \
+				_buildEncoderTables()
+		buffer = self._buffer
+		del buffer[:]
+		extend = buffer.extend
+		extend(b'setcolor:')
+		try:
+			for i, (r, g, b) in pairs:
+				extend(prefixes[i])
+				extend(channels[r])
+				extend(channels[g])
+				extend(lastChannels[b])
+		except (KeyError, TypeError):
+			del buffer[:]
+			extend(str.encode('setcolor:' + ''.join(['%d-%d,%d,%d;' % \
+					((i,) + rgb) for i, rgb in pairs])))
+		if pairs:
+			buffer[-1:] = b'\n'
+		else:
+			extend(b'\n')
+		return buffer
 
-	def _ledColourDef(self, led, rgb):
+	def _sendColours(self, pairs):
 		"""
-		Get the command snippet to set a particular LED to a particular colour.
+		Send a command setting 1-based LED indices to colours.
 
-		:param led: 0-based LED index or its preconfigured alias
-		:type led: str or int
-		:param rgb: Tuple of red, green, blue values (0 to 255) or Colour object
-		:type rgb: tuple
+		The colours are remembered as the last sent when the command is 
+		encoded, so if it fails, every colour last sent is forgotten, since 
+		which the LEDs show is no longer known. In a pipeline the same 
+		happens when the pipeline is flushed.
+
+		:param pairs: list of (index, rgb tuple) tuples
 		"""
-		if Colour is not None and isinstance(rgb, Colour):
-			rgb = rgb.rgb255()
-		return '%d-%d,%d,%d' % tuple([self._ledIndex(led)] + list(rgb))
+		try:
+			self._sendAndExpectOk(self._encodeColours(pairs))
+		except (CommandFailedError, socket.error):
+			self.resetFrame()
+			raise
 
 	def setColour(self, led, rgb):
 		"""
 		Set the specified LED to the specified colour.
 
-		:param led: 0-based LED index or its preconfigured alias
+		:param led: 0-based LED index or its preconfigured alias or group alias
 		:type led: str or int
 		:param rgb: Tuple of red, green, blue values (0 to 255) or Colour object
 		:type rgb: tuple
 		"""
-		self._sendAndExpectOk('setcolor:%s' % self._ledColourDef(led, rgb))
+		self._sendColours(self._resolveColours([(led, rgb)]))
 	setColor = setColour
 
 	def setColours(self, *args):
@@ -665,8 +1695,7 @@ class Lightpack:
 		changed, where the elements of the tuples are the same as the arguments 
 		for the `setColour` method.
 		"""
-		defs = [self._ledColourDef(*arg) for arg in args]
-		self._sendAndExpectOk('setcolor:%s' % ';'.join(defs))
+		self._sendColours(self._resolveColours(args))
 	setColors = setColours
 
 	def setColourToAll(self, rgb):
@@ -676,11 +1705,93 @@ class Lightpack:
 		:param rgb: Tuple of red, green, blue values (0 to 255) or Colour object
 		:type rgb: tuple
 		"""
-		defs = [self._ledColourDef(led, rgb) \
-				for led in range(self.getCountLeds(fresh=False))]
-		self._sendAndExpectOk('setcolor:%s' % ';'.join(defs))
+		rgb = _rgb(rgb)
+		self._sendColours([(i, rgb) \
+				for i in range(1, self.getCountLeds(fresh=False) + 1)])
 	setColorToAll = setColourToAll
 
+	def setColoursArray(self, array):
+		"""
+		Set the colours of LEDs 0 onwards from an array.
+
+		:param array: (N, 3) array of red, green, blue values (0 to 255), or a 
+		list of N tuples of them
+		"""
+		self._sendAndExpectOk('setcolor:%s' % self._writeArray(array, 3))
+		if hasattr(array, 'tolist'):
+			array = array.tolist()
+		self._frame = dict([(index + 1, tuple(rgb)) \
+				for index, rgb in enumerate(array)])
+		self.cache.invalidate('colours')
+	setColorsArray = setColoursArray
+
+	def pushFrame(self, frame, threshold=0, resync=0):
+		"""
+		Send a frame, skipping LEDs which have not changed since last sent.
+
+		The colour last sent to each LED (by this method or by `setColour` and 
+		friends) is remembered, and only LEDs whose colour differs from it by 
+		more than `threshold` in any channel are sent. Nothing at all is sent 
+		if no LED changed.
+
+		:param frame: colours for LEDs 0 onwards, or a dictionary of colours 
+		keyed by 0-based LED index or alias
+		:type frame: list, dict or (N, 3) array
+		:param threshold: largest per-channel change to skip (default 0 -- 
+		send any change)
+		:type threshold: int
+		:param resync: send every LED every this many frames (default 0 -- 
+		never)
+		:type resync: int
+		:returns: number of LEDs sent
+		"""
+		return self._pushResolved(self._resolveFrame(frame), threshold, resync)
+
+	def _resolveFrame(self, frame):
+		"""
+		Resolve a frame as taken by `pushFrame` to (index, rgb tuple) tuples.
+		"""
+		if hasattr(frame, 'tolist'):
+			# NumPy array
+			frame = frame.tolist()
+		if isinstance(frame, dict):
+			items = frame.items()
+		else:
+			items = enumerate(frame)
+		return self._resolveColours(items)
+
+	def _pushResolved(self, pairs, threshold, resync):
+		"""
+		Send the LEDs of a resolved frame which have changed since last sent.
+
+		:returns: number of LEDs sent
+		"""
+		if not (resync and self._framesPushed % resync == 0):
+			frame = self._frame
+			changed = []
+			for i, rgb in pairs:
+				last = frame.get(i)
+				if last is None or \
+						abs(rgb[0] - last[0]) > threshold or \
+						abs(rgb[1] - last[1]) > threshold or \
+						abs(rgb[2] - last[2]) > threshold:
+					changed.append((i, rgb))
+			pairs = changed
+		self._framesPushed += 1
+		if pairs:
+			self._sendColours(pairs)
+		return len(pairs)
+
+	def resetFrame(self):
+		"""
+		Forget the colours last sent, so the next `pushFrame` sends every LED.
+
+		Call this if something else may have changed the LEDs' colours, for 
+		instance after unlocking and locking again.
+		"""
+		self._frame = {}
+		self._framesPushed = 0
+
 	def setGamma(self, gamma):
 		"""
 		Set the gamma setting to the given value.
@@ -722,12 +1833,8 @@ class Lightpack:
 
 		Raises a CommandDeprecatedError if no longer supported by API.
 		"""
-		api_version_max = StrictVersion('1.5')
-		if self._apiVersion > api_version_max:
-			raise CommandDeprecatedError('setDevice()', api_version_max,
-					self._apiVersion)
-
 		self._sendAndExpectOk('setdevice:%s' % device)
+		self.cache.invalidate('maxLeds')
 
 	def setMode(self, mode):
 		"""
@@ -746,6 +1853,9 @@ class Lightpack:
 		:type profile: str
 		"""
 		self._sendAndExpectOk('setprofile:%s' % profile)
+		# Each profile has its own LED count and sizes
+		self.cache.invalidate('countLeds', 'ledSizes')
+		self._index = None
 
 	def addProfile(self, profile):
 		"""
@@ -755,6 +1865,7 @@ class Lightpack:
 		:type profile: str
 		"""
 		self._sendAndExpectOk('newprofile:%s' % profile)
+		self.cache.invalidate('profiles')
 
 	def deleteProfile(self, profile):
 		"""
@@ -764,6 +1875,7 @@ class Lightpack:
 		:type profile: str
 		"""
 		self._sendAndExpectOk('deleteprofile:%s' % profile)
+		self.cache.invalidate('profiles')
 
 	def setCountLeds(self, count):
 		"""
@@ -776,34 +1888,33 @@ class Lightpack:
 
 		Raises a CommandDeprecatedError if no longer supported by API.
 		"""
-		api_version_max = StrictVersion('1.5')
-		if self._apiVersion > api_version_max:
-			raise CommandDeprecatedError('setCountLeds()', api_version_max,
-					self._apiVersion)
-
 		self._sendAndExpectOk('setcountleds:%s' % count)
+		self.cache.invalidate('countLeds', 'ledSizes')
+		self._index = None
 
 	def _ledSizeDef(self, led, rectangle):
 		"""
 		Get the command snippet to set a particular LED to a particular size.
 
-		:param led: 0-based LED index or its preconfigured alias
+		:param led: 0-based LED index or its preconfigured alias or group alias
 		:type led: str or int
 		:param rectangle: Tuple of x-position, y-position, width and height
 		"""
-		return '%d-%d,%d,%d,%d' % tuple([self._ledIndex(led)] + list(
-			rectangle))
+		rectangle = tuple(rectangle)
+		return ';'.join(['%d-%d,%d,%d,%d' % ((i,) + rectangle) \
+				for i in self._ledIndices(led)])
 
 	def setSize(self, led, rectangle):
 		"""
 		Set the specified LED to a specific position and size.
 
-		:param led: 0-based LED index or its preconfigured alias
+		:param led: 0-based LED index or its preconfigured alias or group alias
 		:type led: str or int
 		:param rectangle: x-position, y-position, width and height
 		:type rectangle: tuple
 		"""
 		self._sendAndExpectOk('setleds:%s' % self._ledSizeDef(led, rectangle))
+		self.cache.invalidate('ledSizes')
 
 	def setSizes(self, *args):
 		"""
@@ -815,6 +1926,17 @@ class Lightpack:
 		"""
 		defs = [self._ledSizeDef(*arg) for arg in args]
 		self._sendAndExpectOk('setleds:%s' % ';'.join(defs))
+		self.cache.invalidate('ledSizes')
+
+	def setSizesArray(self, array):
+		"""
+		Set the positions and sizes of LEDs 0 onwards from an array.
+
+		:param array: (N, 4) array of x-position, y-position, width and 
+		height, or a list of N tuples of them
+		"""
+		self._sendAndExpectOk('setleds:%s' % self._writeArray(array, 4))
+		self.cache.invalidate('ledSizes')
 
 	def _colourDef(self, rgb):
 		"""
@@ -823,9 +1945,7 @@ class Lightpack:
 		:param rgb: Tuple of red, green, blue values (0 to 255) or Colour object
 		:type rgb: tuple
 		"""
-		if Colour is not None and isinstance(rgb, Colour):
-			rgb = rgb.rgb255()
-		return '%d,%d,%d' % rgb
+		return '%d,%d,%d' % _rgb(rgb)
 
 	def setSoundVizColour(self, min_rgb, max_rgb):
 		"""
@@ -842,10 +1962,6 @@ class Lightpack:
 
 		Raises a CommandNotSupportedError if API version is too low.
 		"""
-		api_version_min = StrictVersion('2.1')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('setSoundVizColour()', api_version_min,
-					self._apiVersion)
 		self._sendAndExpectOk('setsoundvizcolors:%s;%s' % (self._colourDef(
 			min_rgb), self._colourDef(max_rgb)))
 	setSoundVizColor = setSoundVizColour
@@ -856,10 +1972,6 @@ class Lightpack:
 
 		Since API v2.1
 		"""
-		api_version_min = StrictVersion('2.1')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('setSoundVizLiquid()', api_version_min,
-					self._apiVersion)
 		self._sendAndExpectOk('setsoundvizliquid:on')
 
 	def disableSoundVizLiquid(self):
@@ -870,10 +1982,6 @@ class Lightpack:
 
 		Raises a CommandNotSupportedError if API version is too low.
 		"""
-		api_version_min = StrictVersion('2.1')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('setSoundVizLiquid()', api_version_min,
-					self._apiVersion)
 		self._sendAndExpectOk('setsoundvizliquid:off')
 
 	def setSession(self, key):
@@ -893,13 +2001,83 @@ class Lightpack:
 		instance, it won't capture from the screen and update its colours while 
 		locked.
 		"""
+		self.cache.invalidate('colours')
 		self._sendAndExpectSuccess('lock')
+		self._locked = True
 
 	def unlock(self):
 		"""
 		Unlock the Lightpack, thereby releasing control to other processes.
 		"""
-		self._sendAndExpectSuccess('unlock')
+		self.cache.invalidate('colours')
+		try:
+			self._sendAndExpectSuccess('unlock')
+		finally:
+			self._released()
+		self._locked = False
+
+	def acquireLock(self, timeout=None, priority=0):
+		"""
+		Lock the Lightpack, waiting while another client holds the lock.
+
+		Waiters in this process for the same server are queued by priority 
+		then by arrival in the process's `LockManager`, and only the first 
+		polls the server, with adaptive backoff. Release the lock with 
+		`unlock()` (or `disconnect()`), which wakes the next waiter at once.
+
+		Raises a LockTimeoutError if the lock isn't acquired in time.
+
+		:param timeout: seconds to wait (default None -- wait indefinitely)
+		:type timeout: float
+		:param priority: waiters with higher priorities are served first 
+		(default 0)
+		:type priority: int
+		:returns: seconds waited
+		"""
+		if self._lockManager is None:
+			self._lockManager = LockManager.forServer(self.host, self.port)
+		stats = self.lockStats
+		try:
+			seconds, attempts = self._lockManager.acquire(self, timeout,
+					priority)
+		except LockTimeoutError as e:
+			stats['attempts'] += e.attempts
+			stats['timeouts'] += 1
+			raise
+		stats['attempts'] += attempts
+		stats['acquisitions'] += 1
+		stats['last'] = seconds
+		stats['max'] = max(stats['max'], seconds)
+		stats['total'] += seconds
+		return seconds
+
+	@_contextManager
+	def locked(self, timeout=None, priority=0):
+		"""
+		Context manager holding the lock for the duration of a block:
+
+			with lp.locked(timeout=5) as waited:
+				lp.setColourToAll((255, 0, 0))
+
+		The lock is acquired as by `acquireLock()`, which gives the seconds 
+		waited, and released when the block exits.
+		"""
+		seconds = self.acquireLock(timeout, priority)
+		try:
+			yield seconds
+		finally:
+			try:
+				self.unlock()
+			except (CommandFailedError, socket.error):
+				pass
+
+	def _released(self):
+		"""
+		Tell the lock manager, if any, that this Lightpack no longer holds the 
+		lock.
+		"""
+		if self._lockManager is not None:
+			self._lockManager.release(self)
 
 	def persist(self):
 		"""
@@ -912,10 +2090,6 @@ class Lightpack:
 
 		Raises a CommandNotSupportedError if API version is too low.
 		"""
-		api_version_min = StrictVersion('2.2')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('enablePersistence()', api_version_min,
-					self._apiVersion)
 		return self._sendAndExpectOk('setpersistonunlock:on')
 
 	def unpersist(self):
@@ -929,10 +2103,6 @@ class Lightpack:
 
 		Raises a CommandNotSupportedError if API version is too low.
 		"""
-		api_version_min = StrictVersion('2.2')
-		if self._apiVersion < api_version_min:
-			raise CommandNotSupportedError('disablePersistence()', api_version_min, 
-					self._apiVersion)
 		return self._sendAndExpectOk('setpersistonunlock:off')
 
 	def _setStatus(self, status):
@@ -961,14 +2131,1119 @@ class Lightpack:
 		Unlock and disconnect from the Lightpack API.
 
 		This method calls the `unlock()` method before disconnecting but will 
-		not fail if the Lightpack is already unlocked.
+		not fail if the Lightpack is already unlocked, or reconnect to unlock 
+		it.
+		"""
+		reconnect = self.reconnect
+		self.reconnect = False
+		try:
+			self.unlock()
+		except (CommandFailedError, socket.error):
+			pass
+		finally:
+			self.reconnect = reconnect
+		self._released()
+		self._locked = False
+		self.connection.close()
+
+class Pipeline:
+	"""
+	Queue of commands to be sent to a Lightpack in a single round trip.
+
+	Get one from `Lightpack.pipeline()` rather than constructing it directly.
+	"""
+
+	def __init__(self, lightpack):
+		"""
+		Create a pipeline for the given Lightpack.
+
+		:param lightpack: connected Lightpack object
+		:type lightpack: Lightpack
+		"""
+		self.lightpack = lightpack
+		self._commands = []
+
+	def __enter__(self):
+		if self.lightpack._pipeline is not None:
+			raise RuntimeError("A pipeline is already active")
+		self.lightpack._pipeline = self
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.lightpack._pipeline = None
+		if exc_type is None:
+			self._flush()
+		else:
+			self._commands = []
+
+	def __len__(self):
+		return len(self._commands)
+
+	def queue(self, command, expected_response):
+		"""
+		Queue a command and the response it is expected to get.
+
+		:param command: command to send
+		:type command: str
+		:param expected_response: expected response
+		:type expected_response: str
+		"""
+		self._commands.append((command, expected_response))
+
+	def flush(self, command=None):
+		"""
+		Send all queued commands and check their responses.
+
+		:param command: optional extra command whose response is wanted
+		:type command: str
+		:returns: string response to `command`, if given
+		"""
+		if command is None:
+			self.flushAll([])
+			return None
+		return self.flushAll([command])[0]
+
+	def flushAll(self, commands):
+		"""
+		Send all queued commands along with others whose responses are wanted.
+
+		:param commands: extra commands whose responses are wanted
+		:type commands: list
+		:returns: list of string responses to `commands`
+		"""
+		pipeline = self.lightpack._pipeline
+		self.lightpack._pipeline = None
+		try:
+			return self._flush(commands)
+		finally:
+			self.lightpack._pipeline = pipeline
+
+	def _flush(self, wanted=(), forget=True):
+		"""
+		Write the queued commands and any wanted ones in one send and read 
+		every response.
+
+		All responses are read before any error is raised so that the 
+		connection is left in a consistent state. Commands which succeeded are 
+		remembered for restoring after reconnecting.
+
+		:param forget: whether a failed colour command makes the Lightpack 
+		forget the colours last sent (default True); not when restoring them
+
+		:returns: list of string responses to the wanted commands
+		"""
+		commands = self._commands
+		self._commands = []
+		lines = commands + [(c, None) for c in wanted]
+		if not lines:
+			return []
+		start = _clock()
+		try:
+			responses = self._exchange(lines)
+		except socket.error:
+			if not self.lightpack.reconnect:
+				if forget:
+					self._forgetColours(commands)
+				raise
+			self.lightpack._recover()
+			responses = self._exchange(lines)
+		if self.lightpack._observers:
+			self.lightpack._notify([(r.command, r.text) for r in responses],
+					_clock() - start)
+		failed = [r for r in responses if r.failed]
+		for response in responses[:len(commands)]:
+			if not response.failed:
+				self.lightpack._remember(response.command)
+		if failed:
+			if forget:
+				self._forgetColours([(r.command, r.expected) for r in failed])
+			raise CommandFailedError(*failed[0])
+		return [r.text for r in responses[len(commands):]]
+
+	def _forgetColours(self, commands):
+		"""
+		Forget the Lightpack's colours last sent if any of the given commands 
+		set colours, since they failed.
+		"""
+		for sent, _ in commands:
+			if sent.startswith('setcolor:'):
+				self.lightpack.resetFrame()
+				return
+
+	def _exchange(self, commands):
+		"""
+		Send (command, expected_response) tuples in one write and read the 
+		response event to each.
+		"""
+		self.lightpack._sendAll(commands)
+		return [self.lightpack._readEvent() for _ in commands]
+
+class Snapshot(namedtuple('Snapshot', [field[0] for field in \
+		_SNAPSHOT_FIELDS])):
+	"""
+	Immutable state of a Lightpack, as returned by `Lightpack.getSnapshot()`
+
+	Fields are named after the getters they correspond to: `status`, `mode`, 
+	`profile`, `profiles`, `fps`, `brightness`, `gamma`, `smoothness`, 
+	`lockStatus`, `apiStatus`, `countLeds` and `ledSizes`. Lists are tuples, 
+	and `ledSizes` is a tuple of rectangles indexed by 0-based LED.
+	"""
+
+	__slots__ = ()
+
+	@classmethod
+	def fromValues(cls, values):
+		"""
+		Create a snapshot from values as returned by the getters.
+
+		:param values: dictionary keyed by field name; missing fields are None
+		:type values: dict
+		"""
+		frozen = {}
+		for field in cls._fields:
+			value = values.get(field)
+			if isinstance(value, dict):
+				value = tuple([value[key] for key in sorted(value)])
+			elif isinstance(value, list):
+				value = tuple(value)
+			frozen[field] = value
+		return cls(**frozen)
+
+	def diff(self, previous):
+		"""
+		Get the fields which differ from an earlier snapshot.
+
+		:param previous: earlier snapshot, or None to get every field
+		:type previous: Snapshot
+		:returns: dictionary of (old value, new value) tuples keyed by field 
+		name
+		"""
+		if previous is None:
+			previous = (None,) * len(self)
+		return dict([(field, (old, new)) for field, old, new in \
+				zip(self._fields, previous, self) if old != new])
+
+class MetadataCache:
+	"""
+	Cache of values read from a Lightpack, each kept for its own TTL
+
+	Values are cached under a name, such as 'countLeds', and optionally an 
+	argument, such as a monitor number. Each name's time to live in seconds 
+	is looked up in `ttls`, falling back to `default_ttl`; a TTL of None keeps 
+	values until they are invalidated. Lightpack setters invalidate the 
+	values they change.
+
+	`hits` and `misses` count the lookups of each name which were and weren't 
+	answered from the cache; a lookup asking for a fresh value is a miss.
+	"""
+
+	def __init__(self, default_ttl=None):
+		"""
+		Create an empty cache.
+
+		:param default_ttl: seconds to keep values whose names have no TTL of 
+		their own (default None -- until invalidated)
+		:type default_ttl: float
+		"""
+		self.default_ttl = default_ttl
+		self.ttls = {}
+		self.hits = {}
+		self.misses = {}
+		self._values = {}
+
+	def get(self, name, fetch, fresh=False, argument=None):
+		"""
+		Get a cached value, fetching and caching it if it is missing or 
+		expired.
+
+		Values of None are never cached.
+
+		:param name: name of the value
+		:type name: str
+		:param fetch: function returning a new value
+		:type fetch: callable
+		:param fresh: fetch a new value regardless (default False)
+		:type fresh: boolean
+		:param argument: argument the value depends on (default None)
+		:returns: value
+		"""
+		if not fresh:
+			try:
+				value, expires = self._values[name][argument]
+			except KeyError:
+				pass
+			else:
+				if expires is None or _clock() < expires:
+					self.hits[name] = self.hits.get(name, 0) + 1
+					return value
+		self.misses[name] = self.misses.get(name, 0) + 1
+		value = fetch()
+		if value is not None:
+			self.set(name, value, argument)
+		return value
+
+	def set(self, name, value, argument=None):
+		"""
+		Cache a value.
+
+		:param name: name of the value
+		:type name: str
+		:param value: value to cache
+		:param argument: argument the value depends on (default None)
+		"""
+		ttl = self.ttls.get(name, self.default_ttl)
+		expires = None if ttl is None else _clock() + ttl
+		self._values.setdefault(name, {})[argument] = value, expires
+
+	def peek(self, name, argument=None):
+		"""
+		Get a cached value without fetching it, even if it has expired.
+
+		:returns: value, or None if there is none
+		"""
+		try:
+			return self._values[name][argument][0]
+		except KeyError:
+			return None
+
+	def invalidate(self, *names):
+		"""
+		Discard the cached values of the given names, for every argument.
+		"""
+		for name in names:
+			self._values.pop(name, None)
+
+	def clear(self):
+		"""
+		Discard every cached value. Hit and miss counts are kept.
+		"""
+		self._values = {}
+
+class LockManager:
+	"""
+	Queue of the Lightpacks in this process waiting for a server's lock
+
+	There is one manager per server, shared by every Lightpack connected to 
+	it; see `forServer()`. Waiters are served by priority, then in order of 
+	arrival. Only the first waiter polls the server, retrying a busy lock with 
+	jittered exponential backoff, while the others sleep until it is their 
+	turn. While a Lightpack in the process holds the lock the first waiter 
+	polls only every `lockMaxDelay` seconds, in case the holder lost its 
+	connection or was dropped without unlocking, and a release wakes the next 
+	waiter straight away.
+
+	The lock isn't reentrant: a thread waiting for a lock held by the same 
+	Lightpack waits until it is released.
+	"""
+
+	# Seconds to wait after the first busy response, doubling after each later 
+	# one up to the maximum
+	lockDelay = 0.01
+	lockMaxDelay = 0.5
+
+	_managers = {}
+
+	def __init__(self):
+		import threading
+		self.holder = None
+		self._condition = threading.Condition()
+		self._waiters = []
+		self._arrivals = 0
+		self._polling = False
+
+	@classmethod
+	def forServer(cls, host, port):
+		"""
+		Get the manager for a server, creating it if need be.
+		"""
+		try:
+			return cls._managers[host, port]
+		except KeyError:
+			# setdefault is atomic, so racing threads get the same manager
+			return cls._managers.setdefault((host, port), cls())
+
+	@property
+	def waiting(self):
+		"""
+		Number of Lightpacks waiting for the lock.
+		"""
+		return len(self._waiters)
+
+	def acquire(self, lightpack, timeout=None, priority=0):
+		"""
+		Wait for and take the lock for a Lightpack.
+
+		Raises a LockTimeoutError if the lock isn't acquired in time, and 
+		passes on errors from the server other than a busy lock.
+
+		:param lightpack: connected Lightpack to lock
+		:type lightpack: Lightpack
+		:param timeout: seconds to wait (default None -- wait indefinitely)
+		:type timeout: float
+		:param priority: waiters with higher priorities are served first 
+		(default 0)
+		:type priority: int
+		:returns: tuple of the seconds waited and the number of lock commands 
+		sent
+		"""
+		import random
+		start = _clock()
+		delay = self.lockDelay
+		attempts = 0
+		with self._condition:
+			self._arrivals += 1
+			waiter = (-priority, self._arrivals)
+			self._waiters.append(waiter)
+			pollAt = None
+			try:
+				while True:
+					wait = None
+					if self.holder is None:
+						pollAt = None
+					elif pollAt is None:
+						pollAt = _clock() + self.lockMaxDelay
+					if not self._polling and waiter == min(self._waiters) and \
+							self.holder is not lightpack:
+						if pollAt is not None and _clock() < pollAt:
+							wait = pollAt - _clock()
+						else:
+							attempts += 1
+							if self._attempt(lightpack):
+								self.holder = lightpack
+								return _clock() - start, attempts
+							wait = delay / 2 + random.uniform(0, delay / 2)
+							delay = min(delay * 2, self.lockMaxDelay)
+							if pollAt is not None:
+								pollAt = _clock() + self.lockMaxDelay
+					if timeout is not None:
+						remaining = start + timeout - _clock()
+						if remaining <= 0:
+							raise LockTimeoutError(timeout, attempts)
+						wait = remaining if wait is None else min(wait,
+								remaining)
+					self._condition.wait(wait)
+			finally:
+				self._waiters.remove(waiter)
+				# The next waiter may now be first
+				self._condition.notify_all()
+
+	def _attempt(self, lightpack):
+		"""
+		Send one lock command, without holding the condition meanwhile.
+
+		:returns: True if the lock was acquired, False if it was busy
+		"""
+		self._polling = True
+		self._condition.release()
+		try:
+			lightpack.lock()
+			return True
+		except CommandFailedError as e:
+			if e.response != 'lock:busy':
+				raise
+			return False
+		finally:
+			self._condition.acquire()
+			self._polling = False
+			# A waiter which arrived meanwhile may be first now
+			self._condition.notify_all()
+
+	def release(self, lightpack):
+		"""
+		Record that a Lightpack released the lock, waking the waiters.
+		"""
+		with self._condition:
+			if self.holder is lightpack:
+				self.holder = None
+				self._condition.notify_all()
+
+class CommandStats:
+	"""
+	Observer collecting statistics for each command
+
+	Add it to a Lightpack with `Lightpack.addObserver()`. The `commands` 
+	dictionary is keyed by command name, and for each command holds the 
+	number of times it was sent (`count`), the total bytes sent and received 
+	(`sent` and `received`), the total round trip time in seconds (`time`), 
+	and a histogram of round trip times (`histogram`). Entry i of the 
+	histogram counts round trips of less than 2 ** i microseconds, and of at 
+	least half that; the last entry also counts anything slower.
+	"""
+
+	buckets = 32
+
+	def __init__(self):
+		self.commands = {}
+
+	def __call__(self, name, sent, received, seconds):
+		try:
+			stats = self.commands[name]
+		except KeyError:
+			stats = self.commands[name] = {'count': 0, 'sent': 0,
+					'received': 0, 'time': 0.0, 'histogram': [0] * self.buckets}
+		stats['count'] += 1
+		stats['sent'] += sent
+		stats['received'] += received
+		stats['time'] += seconds
+		bucket = min(int(seconds * 1e6).bit_length(), self.buckets - 1)
+		stats['histogram'][bucket] += 1
+
+	def percentile(self, name, fraction):
+		"""
+		Estimate a percentile of a command's round trip time from its 
+		histogram.
+
+		:param name: command name
+		:type name: str
+		:param fraction: percentile as a fraction, for example 0.99
+		:type fraction: float
+		:returns: upper bound of the round trip time in seconds
+		"""
+		histogram = self.commands[name]['histogram']
+		target = fraction * sum(histogram)
+		total = 0
+		for bucket, count in enumerate(histogram):
+			total += count
+			if total >= target:
+				break
+		return 2 ** bucket / 1e6
+
+	def reset(self):
+		"""
+		Forget all statistics collected so far.
+		"""
+		self.commands = {}
+
+class LightpackGroup:
+	"""
+	Several Lightpacks controlled together
+
+	Each command is sent to every Lightpack at once from a pool of threads, so 
+	a command takes as long as the slowest Lightpack rather than the sum of 
+	all of them.
+
+	The group's LEDs form one logical strip spanning all of its Lightpacks. By 
+	default each Lightpack's LEDs follow on from the previous one's, but a 
+	Lightpack can instead be given as a tuple of (lightpack, start, stop) to 
+	map it to that range of the logical strip.
+	"""
+
+	def __init__(self, members):
+		"""
+		Create a group of Lightpacks.
+
+		:param members: Lightpack objects, or tuples of (lightpack, start, 
+		stop) giving the range of logical LEDs each one displays
+		:type members: list
+		"""
+		self.lightpacks = []
+		self._mapping = []
+		for member in members:
+			if isinstance(member, tuple):
+				lightpack, start, stop = member
+				self._mapping.append((start, stop))
+			else:
+				lightpack = member
+				self._mapping.append(None)
+			self.lightpacks.append(lightpack)
+		self._ranges = None
+		from multiprocessing.pool import ThreadPool
+		self._pool = ThreadPool(len(self.lightpacks))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def __len__(self):
+		return len(self.lightpacks)
+
+	def _run(self, calls):
+		"""
+		Run one call per Lightpack concurrently.
+
+		:param calls: list of (lightpack, function, args, kwargs) tuples
+		:returns: GroupResult
+		"""
+		def run(call):
+			lightpack, function, args, kwargs = call
+			try:
+				return function(*args, **kwargs), None
+			except Exception as e:
+				return None, e
+		outcomes = self._pool.map(run, calls)
+		return GroupResult([(call[0],) + outcome \
+				for call, outcome in zip(calls, outcomes)])
+
+	def broadcast(self, method, *args, **kwargs):
+		"""
+		Call the same method with the same arguments on every Lightpack.
+
+		For example `group.broadcast('setBrightness', 50)`.
+
+		:param method: name of the Lightpack method to call
+		:type method: str
+		:returns: GroupResult
+		"""
+		return self._run([(lightpack, getattr(lightpack, method), args,
+				kwargs) for lightpack in self.lightpacks])
+
+	def ranges(self):
+		"""
+		Get the range of logical LEDs displayed by each Lightpack.
+
+		Lightpacks not given an explicit range are asked for their LED count 
+		the first time this is called, so they must be connected.
+
+		:returns: list of (start, stop) tuples, in the order of `lightpacks`
+		"""
+		if self._ranges is None:
+			counts = self._run([(lightpack, lightpack.getCountLeds, (),
+					{'fresh': False}) for lightpack, mapping in zip(
+					self.lightpacks, self._mapping) if mapping is None])
+			counts.check()
+			ranges = []
+			start = 0
+			for lightpack, mapping in zip(self.lightpacks, self._mapping):
+				if mapping is None:
+					mapping = start, start + counts.results[lightpack]
+				ranges.append(mapping)
+				start = mapping[1]
+			self._ranges = ranges
+		return self._ranges
+
+	def scatter(self, method, frame, *args, **kwargs):
+		"""
+		Call a method on every Lightpack with its own part of a frame.
+
+		Each Lightpack is passed the slice of `frame` for its range of logical 
+		LEDs as the first argument, followed by any other arguments.
+
+		:param method: name of the Lightpack method to call
+		:type method: str
+		:param frame: colours for the whole logical strip
+		:type frame: list or array
+		:returns: GroupResult
+		"""
+		return self._run([(lightpack, getattr(lightpack, method),
+				(frame[start:stop],) + args, kwargs) \
+				for lightpack, (start, stop) in zip(self.lightpacks,
+						self.ranges())])
+
+	def setColoursArray(self, frame):
+		"""
+		Set the colours of the whole logical strip.
+
+		:param frame: colours for the whole logical strip
+		:type frame: list or (N, 3) array
+		:returns: GroupResult
+		"""
+		return self.scatter('setColoursArray', frame)
+	setColorsArray = setColoursArray
+
+	def pushFrame(self, frame, threshold=0, resync=0):
+		"""
+		Push a frame for the whole logical strip, sending only changed LEDs.
+
+		See `Lightpack.pushFrame`.
+
+		:param frame: colours for the whole logical strip
+		:type frame: list or (N, 3) array
+		:returns: GroupResult
+		"""
+		return self.scatter('pushFrame', frame, threshold=threshold,
+				resync=resync)
+
+	def connect(self):
+		"""
+		Connect every Lightpack.
+
+		:returns: GroupResult
+		"""
+		return self.broadcast('connect')
+
+	def disconnect(self):
+		"""
+		Disconnect every Lightpack and stop the thread pool.
+
+		:returns: GroupResult
+		"""
+		try:
+			return self.broadcast('disconnect')
+		finally:
+			self.close()
+
+	def close(self):
+		"""
+		Stop the thread pool without disconnecting.
+		"""
+		self._pool.close()
+		self._pool.join()
+
+class GroupResult:
+	"""
+	Outcome of a command sent to a LightpackGroup
+
+	`results` and `errors` are dictionaries keyed by Lightpack object, holding 
+	the return value or the exception raised for each one.
+	"""
+
+	def __init__(self, outcomes):
+		"""
+		:param outcomes: list of (lightpack, result, error) tuples
+		:type outcomes: list
+		"""
+		self.outcomes = outcomes
+		self.results = dict([(l, r) for l, r, e in outcomes if e is None])
+		self.errors = dict([(l, e) for l, r, e in outcomes if e is not None])
+
+	@property
+	def ok(self):
+		"""
+		Whether every Lightpack succeeded.
+		"""
+		return not self.errors
+
+	def check(self):
+		"""
+		Raise a GroupCommandError if any Lightpack failed.
+
+		:returns: this object, if all succeeded
+		"""
+		if self.errors:
+			raise GroupCommandError(self.errors)
+		return self
+
+class FrameScheduler:
+	"""
+	Send frames to a Lightpack at a fixed rate, keeping only the newest
+
+	Frames can be submitted from any thread at any rate. A background thread 
+	sends them at most `fps` times per second; a frame submitted while another 
+	is still waiting replaces it, so a fast producer never builds up a backlog.
+
+	The `stats` property counts frames submitted, sent, coalesced (replaced by 
+	a newer one before being sent), dropped (waited longer than `max_age`) and 
+	late (sent more than a frame period after their slot), plus send errors.
+
+	Frames are sent, and when following the Lightpack's rate `getFps()` is 
+	called, from the background thread, so don't use the Lightpack from other 
+	threads meanwhile unless it is a `ThreadedLightpack`.
+	"""
+
+	# Frames per second sent when following a Lightpack which hasn't reported 
+	# a positive rate yet; later non-positive rates keep the last positive one
+	fallbackFps = 25.0
+
+	def __init__(self, lightpack, fps=None, max_age=None, method='pushFrame',
+			adapt_interval=5.0):
+		"""
+		Create a scheduler. It doesn't send anything until `start()` is called.
+
+		:param lightpack: connected Lightpack or LightpackGroup
+		:param fps: frames per second to send (default None -- follow the 
+		Lightpack's `getFps()`)
+		:type fps: float
+		:param max_age: seconds after which a waiting frame is dropped rather 
+		than sent (default None -- never)
+		:type max_age: float
+		:param method: name of the method frames are passed to (default 
+		'pushFrame')
+		:type method: str
+		:param adapt_interval: seconds between `getFps()` calls when following 
+		the Lightpack's rate (default 5)
+		:type adapt_interval: float
+		"""
+		import threading
+		self.lightpack = lightpack
+		self.fps = fps
+		self.max_age = max_age
+		self.method = method
+		self.adapt_interval = adapt_interval
+		self.lastError = None
+		self._adaptive = fps is None
+		self._condition = threading.Condition()
+		self._pending = None
+		self._running = False
+		self._thread = None
+		self._stats = dict.fromkeys(['submitted', 'sent', 'coalesced',
+				'dropped', 'late', 'errors'], 0)
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.stop()
+
+	@property
+	def stats(self):
+		"""
+		Counts of frames submitted, sent, coalesced, dropped and late, and of 
+		send errors.
+
+		:returns: dictionary
+		"""
+		with self._condition:
+			return dict(self._stats)
+
+	def submit(self, frame):
+		"""
+		Submit a frame to be sent, replacing any frame still waiting.
+
+		:param frame: frame to pass to the Lightpack's `method`
+		"""
+		with self._condition:
+			self._stats['submitted'] += 1
+			if self._pending is not None:
+				self._stats['coalesced'] += 1
+			self._pending = frame, _clock()
+			self._condition.notify()
+
+	def start(self):
+		"""
+		Start sending frames from a background thread.
+		"""
+		if self._thread is not None:
+			raise RuntimeError("The scheduler is already running")
+		import threading
+		if self._adaptive:
+			self._adapt()
+		self._running = True
+		self._thread = threading.Thread(target=self._loop)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self):
+		"""
+		Stop sending frames. A frame still waiting is discarded.
+		"""
+		with self._condition:
+			self._running = False
+			self._condition.notify()
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+		self._pending = None
+
+	def _loop(self):
+		send = getattr(self.lightpack, self.method)
+		slot = _clock()
+		adapted = slot
+		while True:
+			with self._condition:
+				if self._pending is None:
+					while self._running and self._pending is None:
+						self._condition.wait()
+					# A frame arriving after an idle spell is on time
+					slot = max(slot, _clock())
+				if not self._running:
+					return
+			# Wait for this frame's slot, letting newer frames replace it
+			delay = slot - _clock()
+			if delay > 0:
+				time.sleep(delay)
+			with self._condition:
+				if not self._running:
+					return
+				frame, submitted = self._pending
+				self._pending = None
+			now = _clock()
+			period = 1.0 / self.fps if self.fps else 0
+			if self.max_age is not None and now - submitted > self.max_age:
+				with self._condition:
+					self._stats['dropped'] += 1
+				continue
+			try:
+				send(frame)
+				sent, error = True, None
+			except Exception as e:
+				sent, error = False, e
+			with self._condition:
+				if now - slot > period:
+					self._stats['late'] += 1
+				if sent:
+					self._stats['sent'] += 1
+				else:
+					self._stats['errors'] += 1
+					self.lastError = error
+			# Don't try to catch up after falling behind
+			slot = max(slot + period, now)
+			if self._adaptive and now - adapted >= self.adapt_interval:
+				adapted = now
+				try:
+					self._adapt()
+				except Exception as e:
+					self.lastError = e
+
+	def _adapt(self):
+		"""
+		Follow the Lightpack's rate, ignoring rates which aren't positive, 
+		since they would leave frames unpaced.
+		"""
+		fps = self.lightpack.getFps()
+		if fps > 0:
+			self.fps = fps
+		elif not self.fps:
+			self.fps = self.fallbackFps
+
+class ThreadedLightpack(Lightpack):
+	"""
+	Lightpack which may be used from several threads at once
+
+	One background I/O thread owns the connection. Commands from every 
+	thread are queued, written together in a single send whenever the I/O 
+	thread is free, and each response is handed back to the thread which sent 
+	the command, so writes never interleave and responses never go astray.
+
+	Methods returning a value block until their response arrives. Commands 
+	which only expect an acknowledgement (`setColours`, `setBrightness` and so 
+	on) are fire-and-forget: they return as soon as they are queued, and a 
+	failure is raised by the next `flush()`. `lock`, `unlock` and `connect` 
+	still wait, so their failures are raised straight away. Use `submit` to 
+	get a future for any command.
+
+	Automatic reconnection isn't supported.
+	"""
+
+	def __init__(self, *args, **kwargs):
+		"""
+		Create a thread-safe lightpack object. Takes the same arguments as 
+		Lightpack.
+		"""
+		import threading
+		if _optional('concurrent.futures') is None:
+			raise ImportError("ThreadedLightpack requires concurrent.futures " \
+					"(the futures package on Python 2)")
+		Lightpack.__init__(self, *args, **kwargs)
+		if self.reconnect:
+			raise ValueError("ThreadedLightpack can't reconnect automatically")
+		self._condition = threading.Condition()
+		self._queue = deque()
+		self._stateLock = threading.RLock()
+		self._last = None
+		self._failures = []
+		self._frameStale = False
+		self._running = False
+		self._thread = None
+
+	def submit(self, command, expected_response=None):
+		"""
+		Queue a command to be sent by the I/O thread.
+
+		:param command: command to send, without the trailing newline, or a 
+		bytearray ending with one
+		:type command: str or bytearray
+		:param expected_response: response expected, or None to accept any 
+		(default None)
+		:type expected_response: str
+		:returns: Future resolving to the string response, or raising a 
+		CommandFailedError if it isn't the expected one
+		"""
+		return self._submit(command, expected_response, False)
+
+	def _submit(self, command, expected_response, forget):
+		"""
+		Queue a command, remembering whether its failure is left for `flush()` 
+		to raise.
+		"""
+		if isinstance(command, bytearray):
+			data = bytearray(command)
+		else:
+			data = bytearray(Protocol.encode(command))
+		future = _optional('concurrent.futures').Future()
+		with self._condition:
+			if not self._running:
+				raise RuntimeError("Not connected")
+			self._queue.append((data, expected_response, future, forget))
+			self._last = future
+			self._condition.notify()
+		return future
+
+	def _sendAndReceive(self, command):
+		"""
+		Send a command through the I/O thread and wait for the response.
+		"""
+		return self.submit(command).result()
+
+	def _sendAndReceiveAll(self, commands):
+		"""
+		Queue several commands and wait for all the responses.
+		"""
+		futures = [self.submit(command) for command in commands]
+		return [future.result() for future in futures]
+
+	def _sendAndExpect(self, command, expected_response):
+		"""
+		Queue a command without waiting; `flush()` raises a CommandFailedError 
+		if it fails.
+		"""
+		self._submit(command, expected_response, True)
+
+	def _encodeColours(self, pairs):
+		"""
+		Encode a colour command into a new bytearray, since the shared buffer 
+		could be reused by another thread before this one is sent.
+		"""
+		with self._stateLock:
+			return bytearray(Lightpack._encodeColours(self, pairs))
+
+	def pushFrame(self, frame, threshold=0, resync=0):
+		"""
+		Send a frame, skipping LEDs which have not changed since last sent. 
+		See `Lightpack.pushFrame()`.
+
+		Frames pushed from different threads are compared with each other's 
+		colours one at a time.
+		"""
+		# Resolve first: it may wait for the LED count, which mustn't be done 
+		# holding the state lock
+		pairs = self._resolveFrame(frame)
+		with self._stateLock:
+			self._resetStaleFrame()
+			return self._pushResolved(pairs, threshold, resync)
+
+	def resetFrame(self):
+		"""
+		Forget the colours last sent, so the next frame is sent in full.
+		"""
+		with self._stateLock:
+			Lightpack.resetFrame(self)
+
+	def _resetStaleFrame(self):
+		"""
+		Forget the colours last sent if the I/O thread found a colour command 
+		failed. The I/O thread only flags this, since it mustn't wait for the 
+		state lock.
+		"""
+		with self._condition:
+			stale = self._frameStale
+			self._frameStale = False
+		if stale:
+			self.resetFrame()
+
+	@_contextManager
+	def pipeline(self):
+		"""
+		Commands are already written together by the I/O thread, so this only 
+		waits for the commands sent in the block when it exits, raising the 
+		first failure like a Pipeline does.
+		"""
+		yield self
+		self.flush()
+
+	def flush(self):
+		"""
+		Wait until every command queued so far has been answered, then raise 
+		the first failure of a fire-and-forget command since the last flush.
+		"""
+		last = self._last
+		if last is not None:
+			last.exception()
+		with self._condition:
+			failures = self._failures
+			self._failures = []
+		self._resetStaleFrame()
+		if failures:
+			raise failures[0]
+
+	def lock(self):
+		"""
+		Lock the Lightpack, waiting for the response. See `Lightpack.lock()`.
+		"""
+		self.cache.invalidate('colours')
+		# Only count the Lightpack as locked once the server agrees
+		self.submit('lock', 'lock:success').result()
+		self._locked = True
+		self.flush()
+
+	def unlock(self):
+		"""
+		Unlock the Lightpack, waiting for the response.
+		"""
+		Lightpack.unlock(self)
+		self.flush()
+
+	def _open(self):
+		"""
+		Open the connection and start the I/O thread.
+		"""
+		import threading
+		Lightpack._open(self)
+		self._running = True
+		self._thread = threading.Thread(target=self._loop)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def disconnect(self):
+		"""
+		Unlock, wait for queued commands, stop the I/O thread and disconnect.
 		"""
 		try:
 			self.unlock()
-		except CommandFailedError:
+		except (CommandFailedError, socket.error):
 			pass
+		with self._condition:
+			self._running = False
+			self._condition.notify()
+		self._thread.join()
+		self._released()
+		self._locked = False
 		self.connection.close()
 
+	def _loop(self):
+		while True:
+			with self._condition:
+				while self._running and not self._queue:
+					self._condition.wait()
+				if not self._queue:
+					return
+				batch = list(self._queue)
+				self._queue.clear()
+			start = _clock()
+			try:
+				self._sendAll([(c[0], c[1]) for c in batch])
+				responses = [self._readEvent() for _ in batch]
+			except Exception as e:
+				# The connection is broken, so nothing in the batch can be 
+				# matched to a response
+				self._settle(batch, [None] * len(batch), [e] * len(batch))
+				continue
+			if self._observers:
+				self._notify([(r.command, r.text) for r in responses],
+						_clock() - start)
+			errors = [CommandFailedError(r.command[:-1].decode('utf-8'),
+					r.text, r.expected) if r.failed else None \
+					for r in responses]
+			self._settle(batch, [r.text for r in responses], errors)
+
+	def _settle(self, batch, responses, errors):
+		"""
+		Resolve the futures of a batch of commands.
+
+		Failures of fire-and-forget commands are kept for `flush()` before any 
+		future is resolved, so a `flush()` woken by a later command in the 
+		batch always sees them.
+		"""
+		failures = []
+		stale = False
+		for (data, expected, future, forget), error in zip(batch, errors):
+			if error is not None and forget:
+				# The colours last sent are no longer known
+				stale = stale or data.startswith(b'setcolor:')
+				failures.append(error)
+		if failures:
+			with self._condition:
+				self._failures.extend(failures)
+				self._frameStale = self._frameStale or stale
+		for (data, expected, future, forget), response, error in zip(batch,
+				responses, errors):
+			if error is None:
+				future.set_result(response)
+			else:
+				future.set_exception(error)
+
 class CannotConnectError(RuntimeError):
 	def __init__(self, message, cause = None):
 		if cause is not None:
@@ -990,6 +3265,23 @@ class CommandFailedError(RuntimeError):
 		self.expected = expected
 
 
+class LockTimeoutError(RuntimeError):
+	def __init__(self, timeout, attempts):
+		super(LockTimeoutError, self).__init__( \
+				"Could not lock the Lightpack within %ss" % timeout)
+		self.timeout = timeout
+		self.attempts = attempts
+
+
+class GroupCommandError(RuntimeError):
+	def __init__(self, errors):
+		super(GroupCommandError, self).__init__( \
+				"Command failed on %d Lightpack(s): %s" % (len(errors),
+				'; '.join(["%s:%d %s" % (l.host, l.port, e) \
+						for l, e in errors.items()])))
+		self.errors = errors
+
+
 class CommandDeprecatedError(RuntimeError):
 	def __init__(self, method, maximum, version):
 		message = "%s is deprecated in API version '%s'. The last " \
@@ -0,0 +1,336 @@
+"""
+Binary animation files for the Lightpack.
+
+An animation file is a 16-byte header followed by every frame's colours as
+contiguous bytes. The header is, in little-endian order:
+
+- the magic bytes 'LPAN'
+- format version, unsigned 16-bit (currently 1)
+- number of LEDs, unsigned 16-bit
+- number of frames, unsigned 32-bit
+- frames per second, 32-bit float
+
+Each frame is then one red, green and blue byte per LED, for LEDs 0 onwards.
+
+Files are memory-mapped for playback, so only the frames being played are
+read into memory, however long the animation:
+
+	with AnimationWriter('show.lpan', leds=300, fps=30) as writer:
+		for frame in frames:
+			writer.write(frame)
+
+	with Animation('show.lpan') as animation:
+		AnimationPlayer(lp, animation, loop=True).play()
+"""
+
+from __future__ import division
+
+import mmap
+import struct
+import threading
+import time
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+from lightpack import _clock
+
+MAGIC = b'LPAN'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIf')
+
+class AnimationWriter:
+	"""
+	Write frames to an animation file one at a time.
+	"""
+
+	def __init__(self, path, leds, fps):
+		"""
+		Create an animation file, replacing any existing one.
+
+		:param path: file to write
+		:type path: str
+		:param leds: number of LEDs in each frame
+		:type leds: int
+		:param fps: frames per second to play at
+		:type fps: float
+		"""
+		self.leds = leds
+		self.fps = fps
+		self.frames = 0
+		self._file = open(path, 'wb')
+		self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, leds, 0, fps))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def write(self, frame):
+		"""
+		Append a frame.
+
+		:param frame: colours for LEDs 0 onwards
+		:type frame: (N, 3) array or list of tuples
+		"""
+		if numpy is not None:
+			data = numpy.asarray(frame, dtype=numpy.uint8).tobytes()
+		else:
+			data = bytes(bytearray([c for rgb in frame for c in rgb]))
+		if len(data) != self.leds * 3:
+			raise ValueError("Frame has %d LEDs, expected %d" % (len(data) // 3,
+					self.leds))
+		self._file.write(data)
+		self.frames += 1
+
+	def close(self):
+		"""
+		Write the frame count into the header and close the file.
+		"""
+		self._file.seek(0)
+		self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.leds,
+				self.frames, self.fps))
+		self._file.close()
+
+class Animation:
+	"""
+	Memory-mapped animation file
+
+	Frames are views of the mapped file, so reading one doesn't copy the rest.
+	"""
+
+	def __init__(self, path):
+		"""
+		Open an animation file.
+
+		Raises a ValueError if the file isn't a valid animation.
+
+		:param path: file to open
+		:type path: str
+		"""
+		self._file = open(path, 'rb')
+		try:
+			self._mmap = mmap.mmap(self._file.fileno(), 0,
+					access=mmap.ACCESS_READ)
+		except ValueError:
+			self._file.close()
+			raise ValueError("%s is empty" % path)
+		if len(self._mmap) < HEADER.size:
+			self.close()
+			raise ValueError("%s is too short to be an animation" % path)
+		magic, version, self.leds, self.frames, self.fps = \
+				HEADER.unpack_from(self._mmap)
+		if magic != MAGIC or version != FORMAT_VERSION:
+			self.close()
+			raise ValueError("%s isn't a version %d animation" % (path,
+					FORMAT_VERSION))
+		self.frameSize = self.leds * 3
+		if len(self._mmap) < HEADER.size + self.frames * self.frameSize:
+			self.close()
+			raise ValueError("%s is truncated" % path)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def __len__(self):
+		return self.frames
+
+	@property
+	def duration(self):
+		"""
+		Length of the animation in seconds at normal speed.
+		"""
+		return self.frames / self.fps
+
+	def frame(self, index):
+		"""
+		Get a frame without copying it.
+
+		:param index: 0-based frame number
+		:type index: int
+		:returns: (N, 3) uint8 array viewing the file, or a list of tuples
+		without NumPy
+		"""
+		if not 0 <= index < self.frames:
+			raise IndexError("Frame %d out of range (%d frames)" % (index,
+					self.frames))
+		offset = HEADER.size + index * self.frameSize
+		if numpy is not None:
+			return numpy.frombuffer(self._mmap, dtype=numpy.uint8,
+					count=self.frameSize, offset=offset).reshape(self.leds, 3)
+		data = bytearray(self._mmap[offset:offset + self.frameSize])
+		return [tuple(data[i:i + 3]) for i in range(0, self.frameSize, 3)]
+
+	def close(self):
+		"""
+		Unmap and close the file.
+
+		If frames returned by `frame()` are still in use, the mapping is 
+		instead released once they have all gone.
+		"""
+		try:
+			self._mmap.close()
+		except BufferError:
+			pass
+		self._file.close()
+
+class AnimationPlayer:
+	"""
+	Play an animation on a Lightpack in real time
+
+	The frame shown is worked out from the time elapsed, so frames are skipped
+	rather than playback falling behind if the Lightpack is slow. Playback
+	speed, looping and position can all be changed while playing.
+	"""
+
+	def __init__(self, lightpack, animation, speed=1.0, loop=False):
+		"""
+		Create a player, positioned at the start of the animation.
+
+		:param lightpack: connected and locked Lightpack
+		:type lightpack: Lightpack
+		:param animation: animation to play
+		:type animation: Animation
+		:param speed: playback speed, where 1 is normal (default 1)
+		:type speed: float
+		:param loop: whether to start again after the last frame (default
+		False)
+		:type loop: boolean
+		"""
+		self.lightpack = lightpack
+		self.animation = animation
+		self.loop = loop
+		self._speed = speed
+		self._position = 0.0
+		self._anchor = None
+		self._lock = threading.Lock()
+		self._running = False
+		self._thread = None
+
+	@property
+	def position(self):
+		"""
+		Current position in the animation, in seconds at normal speed.
+		"""
+		with self._lock:
+			return self._currentPosition()
+
+	def _currentPosition(self):
+		position = self._position
+		if self._anchor is not None:
+			position += (_clock() - self._anchor) * self._speed
+		duration = self.animation.duration
+		if self.loop and duration > 0:
+			return position % duration
+		return min(position, duration)
+
+	def _reanchor(self):
+		self._position = self._currentPosition()
+		if self._anchor is not None:
+			self._anchor = _clock()
+
+	@property
+	def speed(self):
+		"""
+		Playback speed, where 1 is normal.
+		"""
+		return self._speed
+
+	@speed.setter
+	def speed(self, speed):
+		with self._lock:
+			self._reanchor()
+			self._speed = speed
+
+	def seek(self, seconds):
+		"""
+		Move to a position in the animation.
+
+		:param seconds: position in seconds at normal speed
+		:type seconds: float
+		"""
+		with self._lock:
+			self._reanchor()
+			self._position = seconds
+
+	def seekFrame(self, index):
+		"""
+		Move to a frame of the animation.
+
+		:param index: 0-based frame number
+		:type index: int
+		"""
+		self.seek(index / self.animation.fps)
+
+	@property
+	def finished(self):
+		"""
+		Whether playback has reached the end of a non-looping animation.
+		"""
+		return not self.loop and self.position >= self.animation.duration
+
+	def play(self):
+		"""
+		Play from the current position, blocking until the animation ends or
+		`stop()` is called.
+		"""
+		self._running = True
+		with self._lock:
+			self._anchor = _clock()
+		try:
+			self._play()
+		finally:
+			with self._lock:
+				self._reanchor()
+				self._anchor = None
+			self._running = False
+
+	def start(self):
+		"""
+		Play from the current position in a background thread.
+		"""
+		# A thread which reached the end of the animation may be replaced
+		if self._thread is not None and self._thread.is_alive():
+			raise RuntimeError("The player is already running")
+		self._thread = threading.Thread(target=self.play)
+		self._thread.daemon = True
+		self._running = True
+		self._thread.start()
+
+	def stop(self):
+		"""
+		Pause playback, keeping the current position.
+		"""
+		self._running = False
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+	def _play(self):
+		animation = self.animation
+		last = None
+		while self._running:
+			with self._lock:
+				position = self._currentPosition()
+				speed = self._speed
+			index = min(int(position * animation.fps), animation.frames - 1)
+			if index < 0:
+				return
+			if index != last:
+				self.lightpack.pushFrame(animation.frame(index))
+				last = index
+			if self.finished:
+				return
+			# Sleep until the next frame is due
+			if speed:
+				next = (index + 1) / animation.fps
+				delay = (next - position) / abs(speed)
+				time.sleep(min(max(delay, 0), 0.1))
+			else:
+				time.sleep(0.01)
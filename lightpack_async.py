@@ -0,0 +1,868 @@
+"""
+Asyncio client for the Lightpack API.
+
+Requires Python 3.5 or later.
+"""
+
+import asyncio
+import collections
+
+from lightpack import Lightpack, API_COMMANDS, CannotConnectError, \
+		AliasDoesNotExistError, CommandFailedError, Protocol, Snapshot, \
+		_SNAPSHOT_FIELDS, _rgb, _unsupportedCommands
+
+class AsyncLightpack:
+	"""
+	Asyncio Lightpack control class
+
+	This mirrors the `Lightpack` class, but every method which talks to the
+	Lightpack is a coroutine. Commands are written as soon as they are issued
+	and responses are matched to them in order, so many commands can be in
+	flight at once on a single connection, for example with
+	`asyncio.gather()`. One event loop can drive any number of devices.
+
+	The same exceptions as for the `Lightpack` class are raised.
+	"""
+
+	def __init__(self, host='localhost', port=3636, led_map=None, api_key=None):
+		"""
+		Create an asyncio lightpack object.
+
+		:param host: hostname or IP to connect to (default localhost)
+		:type host: str
+		:param port: port number to use (default 3636)
+		:type port: int
+		:param led_map: List of aliases for LEDs (default None -- no aliases)
+		:type led_map: list
+		:param api_key: API key (password) to provide (default None)
+		:type api_key: str
+		"""
+		self.host = host
+		self.port = port
+		self.led_map = led_map
+		self.api_key = api_key
+		self._reader = None
+		self._writer = None
+		self._readerTask = None
+		self._protocol = None
+		self._waiting = collections.deque()
+		self._apiVersion = None
+		self._countLeds = None
+		self._countMonitors = None
+		self._devices = []
+		self._ledSizes = {}
+		self._maxLeds = None
+		self._monitor = {}
+		self._profiles = []
+		self._screenSize = None
+		self._capabilities = {}
+		self._unsupported = {}
+
+	# Protocol helpers which don't touch the connection are shared with the
+	# blocking client
+	getApiVersion = Lightpack.getApiVersion
+	capabilities = Lightpack.capabilities
+	_name = Lightpack._name
+	_payload = Lightpack._payload
+	_colourDef = Lightpack._colourDef
+
+	async def __aenter__(self):
+		await self.connect()
+		return self
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		await self.disconnect()
+
+	def _requireApi(self, method):
+		"""
+		Raise an error if the API version doesn't support a method.
+
+		:param method: method name, as in API_COMMANDS
+		:type method: str
+		"""
+		if method in self._unsupported:
+			self._unsupported[method]()
+
+	async def _ledIndex(self, led):
+		"""
+		Get the index of the given LED (by alias or index).
+
+		:param led: 0-based LED index or its preconfigured alias
+		:type led: str or int
+
+		Raises an AliasDoesNotExistError if a given alias cannot be found.
+		Raises an IndexError if an LED index is out of bounds.
+
+		:returns: 1-based LED index
+		"""
+		if isinstance(led, str):
+			try:
+				return self.led_map.index(led) + 1
+			except AttributeError:
+				raise AliasDoesNotExistError("There are no aliases defined, " \
+						"so can't resolve LED \"%s\"" % led)
+			except ValueError:
+				raise AliasDoesNotExistError("Alias \"%s\" isn't defined" % led)
+		index = led + 1
+		count = await self.getCountLeds(fresh=False)
+		if index > count:
+			raise IndexError("LED (zero-)index %d out of range " \
+					"(only %d LEDs are connected)" % (led, count))
+		return index
+
+	async def _readEvent(self):
+		"""
+		Read until the protocol has parsed the next greeting or response.
+		"""
+		protocol = self._protocol
+		event = protocol.nextEvent()
+		while event is None:
+			data = await self._reader.read(Lightpack.readSize)
+			if not data:
+				raise ConnectionError("Connection closed by Lightpack")
+			protocol.receive(data)
+			event = protocol.nextEvent()
+		return event
+
+	async def _readLoop(self):
+		"""
+		Hand each response event to the command waiting longest for one.
+
+		If the connection fails, every waiting command gets the exception.
+		"""
+		try:
+			while True:
+				response = await self._readEvent()
+				if self._waiting:
+					future = self._waiting.popleft()
+					if not future.done():
+						future.set_result(response)
+		except Exception as e:
+			while self._waiting:
+				future = self._waiting.popleft()
+				if not future.done():
+					future.set_exception(e)
+
+	async def _sendAndReceive(self, command):
+		"""
+		Send a command and get a response.
+
+		:param command: command to send
+		:type command: str
+		:returns: string response
+		"""
+		return (await self._request(command)).text
+
+	async def _request(self, command, expected_response=None):
+		"""
+		Send a command and get the response event.
+
+		The command is written immediately; other commands may be sent before
+		its response arrives.
+
+		:param command: command to send
+		:type command: str
+		:param expected_response: response expected, or None to accept any
+		(default None)
+		:type expected_response: str
+		:returns: Response
+		"""
+		if self._readerTask is None or self._readerTask.done():
+			raise ConnectionError("Not connected to Lightpack")
+		future = asyncio.get_event_loop().create_future()
+		self._writer.write(self._protocol.send(command, expected_response))
+		self._waiting.append(future)
+		await self._writer.drain()
+		return await future
+
+	async def _sendAndReceivePayload(self, command):
+		"""
+		Send a command and get the payload.
+
+		:param command: command to send
+		:type command: str
+		:returns: string payload
+		"""
+		return self._payload(await self._sendAndReceive(command))
+
+	async def _sendAndExpect(self, command, expected_response):
+		"""
+		Send a command and raise a CommandFailedError if a particular response
+		is not received.
+
+		:param command: command to send
+		:type command: str
+		:param expected_response: expected response
+		:type expected_response: str
+		"""
+		response = await self._request(command, expected_response)
+		if response.failed:
+			raise CommandFailedError(command, response.text, expected_response)
+
+	async def _sendAndExpectOk(self, command):
+		"""
+		Send a command and raise a CommandFailedError if 'ok' is not received.
+
+		:param command: command to send
+		:type command: str
+		"""
+		await self._sendAndExpect(command, 'ok')
+
+	async def _sendAndExpectSuccess(self, command):
+		"""
+		Send a command and raise a CommandFailedError if 'commandname:success'
+		is not received.
+
+		:param command: command to send
+		:type command: str
+		"""
+		await self._sendAndExpect(command, '%s:success' % self._name(command))
+
+	async def getColour(self, led):
+		"""
+		Get the specified LED's colour.
+
+		:param led: 0-based LED index or its preconfigured alias
+		:type led: str or int
+		:returns: Tuple of red, green, blue values (0 to 255)
+		"""
+		index = await self._ledIndex(led)
+		return (await self.getColoursFromAll())[index]
+	getColor = getColour
+
+	async def getColours(self, *args):
+		"""
+		Get the individual colours of multiple LEDs.
+
+		:returns: Dictionary of tuples of red, green, blue values (0 to
+		255), using LED numbers as integer keys
+		"""
+		# No await in comprehensions, which Python 3.5 doesn't allow
+		defs = set()
+		for arg in args:
+			defs.add(await self._ledIndex(arg))
+		colours = await self.getColoursFromAll()
+		return dict([(k, colours[k]) for k in colours if k in defs])
+	getColors = getColours
+
+	async def getColoursFromAll(self):
+		"""
+		Get the colours for all LEDs.
+
+		:returns: Dictionary of tuples of red, green, blue values (0 to
+		255), using LED numbers as integer keys
+		"""
+		return Protocol.readColours(await self._sendAndReceivePayload(
+				'getcolors'))
+	getColorsFromAll = getColoursFromAll
+
+	async def getColourAverage(self):
+		"""
+		Get the average colour of all LEDs.
+
+		:returns: Tuple of red, green, blue values (0 to 255)
+		"""
+		colours = list((await self.getColoursFromAll()).values())
+		count = len(colours)
+		if count == 0:
+			return None
+		return tuple(int(round(sum(c[i] for c in colours) / count)) \
+				for i in range(3))
+	getColorAverage = getColourAverage
+
+	async def getGamma(self):
+		"""
+		Get the current gamma correction value.
+
+		Since API v1.5
+
+		:returns: float
+		"""
+		self._requireApi('getGamma')
+		return float(await self._sendAndReceivePayload('getgamma'))
+
+	async def getSmoothness(self):
+		"""
+		Get the current smoothness value.
+
+		Since API v1.5
+
+		:returns: integer
+		"""
+		self._requireApi('getSmoothness')
+		return int(await self._sendAndReceivePayload('getsmooth'))
+
+	async def getBrightness(self):
+		"""
+		Get the current brightness value.
+
+		Since API v1.5
+
+		:returns: integer
+		"""
+		self._requireApi('getBrightness')
+		return int(await self._sendAndReceivePayload('getbrightness'))
+
+	async def getDevice(self):
+		"""
+		Get the current Lightpack device type.
+
+		:returns: string
+		"""
+		return await self._sendAndReceivePayload('getdevice')
+
+	async def getDevices(self, fresh=True):
+		"""
+		Get a list of compatible Lightpack device types.
+
+		:param fresh: fetch a new value or use cached response
+		:type fresh: boolean
+		:returns: list of strings
+		"""
+		if fresh or self._devices == []:
+			self._devices = (await self._sendAndReceivePayload('getdevices')) \
+				.rstrip(';').split(';')
+		return self._devices
+
+	async def getFps(self):
+		"""
+		Get the current number of frames per second.
+
+		:returns: integer
+		"""
+		return int(await self._sendAndReceivePayload('getfps'))
+
+	async def getMode(self):
+		"""
+		Get the mode of the current profile.
+
+		:returns: string
+		"""
+		return await self._sendAndReceivePayload('getmode')
+
+	async def getPersistence(self):
+		"""
+		Get whether or not the last set colors should persist when unlocking.
+
+		Since API v2.2
+
+		:returns: string, 'on', 'off', possibly others
+		"""
+		self._requireApi('getPersistence')
+		return await self._sendAndReceivePayload('getpersistonunlock')
+
+	async def getProfiles(self, fresh=True):
+		"""
+		Get a list of profile names.
+
+		:param fresh: fetch a new value or use cached response
+		:type fresh: boolean
+		:returns: list of strings
+		"""
+		if fresh or self._profiles == []:
+			self._profiles = (await self._sendAndReceivePayload(
+				'getprofiles')).rstrip(';').split(';')
+		return self._profiles
+
+	async def getProfile(self):
+		"""
+		Get the name of the currently active profile.
+
+		:returns: string
+		"""
+		return await self._sendAndReceivePayload('getprofile')
+
+	async def getScreenSize(self, fresh=True):
+		"""
+		Get the dimensions of the screen.
+
+		:param fresh: fetch a new value or use cached response
+		:type fresh: boolean
+		:returns: tuple of x-position, y-position, width and height
+		"""
+		if fresh or self._screenSize is None:
+			try:
+				coordinates = (await self._sendAndReceivePayload(
+					'getscreensize')).split(',', 3)
+				rectangle = [int(x) for x in coordinates if x.strip()]
+				self._screenSize = tuple(rectangle)
+			except AttributeError:
+				return None
+			except ValueError:
+				return None
+		return self._screenSize
+
+	async def getStatus(self):
+		"""
+		Get the status of the Lightpack (on or off, or possibly other status).
+
+		:returns: string, 'on', 'off' or 'unknown', possibly others
+		"""
+		return await self._sendAndReceivePayload('getstatus')
+
+	async def getCountLeds(self, fresh=True):
+		"""
+		Get the number of LEDs the Lightpack controls.
+
+		:param fresh: fetch a new value or use cached response
+		:type fresh: boolean
+		:returns: integer
+		"""
+		if fresh or self._countLeds is None:
+			self._countLeds = int(await self._sendAndReceivePayload(
+				'getcountleds'))
+		return self._countLeds
+
+	async def getMaxLeds(self, fresh=True):
+		"""
+		Get the maximum number of LEDs the Lightpack controls.
+
+		:param fresh: fetch a new value or use cached response
+		:type fresh: boolean
+		:returns: integer
+		"""
+		if fresh or self._maxLeds is None:
+			self._maxLeds = int(await self._sendAndReceivePayload('getmaxleds'))
+		return self._maxLeds
+
+	async def getLedSizes(self, fresh=True):
+		"""
+		Get the dimensions of all LEDs.
+
+		:param fresh: fetch a new value or use cached response
+		:type fresh: boolean
+		:returns: Dictionary of tuples of x-position, y-position, height and
+		width, using 0-based LED numbers as keys
+		"""
+		if fresh or self._ledSizes == {}:
+			self._ledSizes = Protocol.readRectangles(
+					await self._sendAndReceivePayload('getleds'))
+		return self._ledSizes
+
+	async def getSoundVizColours(self):
+		"""
+		Get min and max color for sound visualization mode.
+
+		Since API v2.1
+
+		:returns: Tuple of two rgb tuples.
+		"""
+		self._requireApi('getSoundVizColours')
+		try:
+			command = await self._sendAndReceivePayload('getsoundvizcolors')
+			parts = command.split(';', 1)
+			colours = []
+			for part in parts:
+				rgb = part.split(',', 2)
+				colours.append([int(x) for x in rgb if x.strip()])
+			if len(colours) != 2:
+				return None
+		except ValueError:
+			return None
+		return tuple(colours[0]), tuple(colours[1])
+	getSoundVizColors = getSoundVizColours
+
+	async def getSoundVizLiquid(self):
+		"""
+		Get whether or not sound visualization is in liquid color mode.
+
+		Since API v2.1
+
+		:returns: string, 'ok' or 'no'.
+		"""
+		self._requireApi('getSoundVizLiquid')
+		return ('no', 'ok')[bool(await self._sendAndReceivePayload(
+			'getsoundvizliquid'))]
+
+	async def getCountMonitors(self, fresh=True):
+		"""
+		Get the number of monitors the Lightpack controls.
+
+		:param fresh: fetch a new value or use cached response
+		:type fresh: boolean
+		:returns: integer
+		"""
+		if fresh or self._countMonitors is None:
+			self._countMonitors = int(await self._sendAndReceivePayload(
+				'countmonitors'))
+		return self._countMonitors
+
+	async def getMonitorSize(self, monitor, fresh=True):
+		"""
+		Get the dimensions of a monitor.
+
+		:param monitor: 0-based monitor index
+		:type monitor: integer
+		:param fresh: fetch a new value or use cached response
+		:type fresh: boolean
+		:returns: tuple of x-position, y-position, width and height
+		"""
+		if fresh or monitor not in self._monitor:
+			try:
+				response = await self._sendAndReceivePayload(
+					'getsizemonitor:%s' % monitor)
+				coordinates = response.split(',', 3)
+				rectangle = [int(x) for x in coordinates if x.strip()]
+				self._monitor[monitor] = tuple(rectangle)
+			except AttributeError:
+				return None
+		return self._monitor[monitor]
+
+	async def getLockStatus(self):
+		"""
+		Get the API lock status (locked or unlocked).
+
+		:returns: string, 'ok', 'no' or 'busy' depending on lock state.
+		"""
+		return await self._sendAndReceivePayload('getlockstatus')
+
+	async def getApiStatus(self):
+		"""
+		Get the API status (busy or idle).
+
+		:returns: string, 'busy' or 'idle' depending on lock state.
+		"""
+		return await self._sendAndReceivePayload('getstatusapi')
+
+	async def getSnapshot(self):
+		"""
+		Get the state of the Lightpack, sending every getter at once.
+
+		Fields the API version doesn't support are None.
+
+		:returns: Snapshot
+		"""
+		fields = [field for field in _SNAPSHOT_FIELDS \
+				if field[1] not in self._unsupported]
+		values = await asyncio.gather(*[getattr(self, field[1])() \
+				for field in fields])
+		return Snapshot.fromValues(dict([(field[0], value) \
+				for field, value in zip(fields, values)]))
+
+	async def connect(self):
+		"""
+		Connect to the Lightpack API.
+
+		A CannotConnectError is raised on failure.
+		"""
+
+		# Function to run if we fail
+		def fail(cause = None):
+			raise CannotConnectError("Could not connect to %s:%d (%s an API key)" % ( \
+					self.host, \
+					self.port, \
+					"without" if self.api_key is None else "with"), \
+					cause)
+
+		# Attempt to connect
+		try:
+			self._protocol = Protocol()
+			self._reader, self._writer = await asyncio.open_connection(
+					self.host, self.port)
+			greeting = await self._readEvent()
+		except Exception as e:
+			fail(e)
+
+		# Check greeting and reported API version
+		self._apiVersion = greeting.version
+		if greeting.error is not None:
+			fail(greeting.error)
+		self._unsupported = _unsupportedCommands(self._apiVersion)
+		self._capabilities = dict([(method, method not in self._unsupported) \
+				for method in API_COMMANDS])
+
+		self._readerTask = asyncio.ensure_future(self._readLoop())
+
+		# Give API key if we have one
+		if self.api_key is not None:
+			response = await self._sendAndReceive('apikey:%s' % self.api_key)
+			if response != 'ok':
+				fail("bad API key (server responded '%s')" % response)
+
+	async def _ledColourDef(self, led, rgb):
+		"""
+		Get the command snippet to set a particular LED to a particular colour.
+
+		:param led: 0-based LED index or its preconfigured alias
+		:type led: str or int
+		:param rgb: Tuple of red, green, blue values (0 to 255) or Colour object
+		:type rgb: tuple
+		"""
+		return '%d-%d,%d,%d' % tuple([await self._ledIndex(led)] +
+				list(_rgb(rgb)))
+
+	async def setColour(self, led, rgb):
+		"""
+		Set the specified LED to the specified colour.
+
+		:param led: 0-based LED index or its preconfigured alias
+		:type led: str or int
+		:param rgb: Tuple of red, green, blue values (0 to 255) or Colour object
+		:type rgb: tuple
+		"""
+		await self._sendAndExpectOk('setcolor:%s' % await self._ledColourDef(
+			led, rgb))
+	setColor = setColour
+
+	async def setColours(self, *args):
+		"""
+		Set individual colours of multiple LEDs.
+
+		Each argument should be a tuple of (led, rgb) for each LED to be
+		changed, where the elements of the tuples are the same as the arguments
+		for the `setColour` method.
+		"""
+		defs = []
+		for arg in args:
+			defs.append(await self._ledColourDef(*arg))
+		await self._sendAndExpectOk('setcolor:%s' % ';'.join(defs))
+	setColors = setColours
+
+	async def setColourToAll(self, rgb):
+		"""
+		Set all LEDs to the specified colour.
+
+		:param rgb: Tuple of red, green, blue values (0 to 255) or Colour object
+		:type rgb: tuple
+		"""
+		count = await self.getCountLeds(fresh=False)
+		defs = []
+		for led in range(count):
+			defs.append(await self._ledColourDef(led, rgb))
+		await self._sendAndExpectOk('setcolor:%s' % ';'.join(defs))
+	setColorToAll = setColourToAll
+
+	async def setGamma(self, gamma):
+		"""
+		Set the gamma setting to the given value.
+
+		:param gamma: gamma in the range 0.01 to 10.0
+		:type gamma: float
+		"""
+		await self._sendAndExpectOk('setgamma:%s' % gamma)
+
+	async def setSmoothness(self, smoothness):
+		"""
+		Set the smoothness setting to the given value.
+
+		:param smoothness: smoothness in the range 0 to 255
+		:type smoothness: int
+		"""
+		await self._sendAndExpectOk('setsmooth:%s' % smoothness)
+
+	async def setBrightness(self, brightness):
+		"""
+		Set the brightness modifier of all LEDs to the given value.
+
+		:param brightness: brightness in the range 0 to 100
+		:type brightness: int
+		"""
+		await self._sendAndExpectOk('setbrightness:%s' % brightness)
+
+	async def setDevice(self, device):
+		"""
+		Set the Lightpack device type.
+
+		Deprecated in API v2.0
+
+		:param device: device type (see `getDevices()`)
+		:type device: str
+		"""
+		self._requireApi('setDevice')
+		await self._sendAndExpectOk('setdevice:%s' % device)
+
+	async def setMode(self, mode):
+		"""
+		Set the Lightpack mode.
+
+		:param mode: mode to activate
+		:type mode: str
+		"""
+		await self._sendAndExpectOk('setmode:%s' % mode)
+
+	async def setProfile(self, profile):
+		"""
+		Set the current Lightpack profile.
+
+		:param profile: profile to activate
+		:type profile: str
+		"""
+		await self._sendAndExpectOk('setprofile:%s' % profile)
+
+	async def addProfile(self, profile):
+		"""
+		Create a new Lightpack profile.
+
+		:param profile: profile to create
+		:type profile: str
+		"""
+		await self._sendAndExpectOk('newprofile:%s' % profile)
+
+	async def deleteProfile(self, profile):
+		"""
+		Delete a Lightpack profile.
+
+		:param profile: profile to delete
+		:type profile: str
+		"""
+		await self._sendAndExpectOk('deleteprofile:%s' % profile)
+
+	async def setCountLeds(self, count):
+		"""
+		Set the number of LEDs.
+
+		Deprecated in API v2.0
+
+		:param count: Number of LEDs
+		:type count: int
+		"""
+		self._requireApi('setCountLeds')
+		await self._sendAndExpectOk('setcountleds:%s' % count)
+
+	async def _ledSizeDef(self, led, rectangle):
+		"""
+		Get the command snippet to set a particular LED to a particular size.
+
+		:param led: 0-based LED index or its preconfigured alias
+		:type led: str or int
+		:param rectangle: Tuple of x-position, y-position, width and height
+		"""
+		return '%d-%d,%d,%d,%d' % tuple([await self._ledIndex(led)] + list(
+			rectangle))
+
+	async def setSize(self, led, rectangle):
+		"""
+		Set the specified LED to a specific position and size.
+
+		:param led: 0-based LED index or its preconfigured alias
+		:type led: str or int
+		:param rectangle: x-position, y-position, width and height
+		:type rectangle: tuple
+		"""
+		await self._sendAndExpectOk('setleds:%s' % await self._ledSizeDef(led,
+			rectangle))
+
+	async def setSizes(self, *args):
+		"""
+		Set individual sizes of multiple LEDs.
+
+		Each argument should be a tuple of (led, rectangle) for each LED to be
+		changed, where the elements of the tuples are the same as the arguments
+		for the `setSize` method.
+		"""
+		defs = []
+		for arg in args:
+			defs.append(await self._ledSizeDef(*arg))
+		await self._sendAndExpectOk('setleds:%s' % ';'.join(defs))
+
+	async def setSoundVizColour(self, min_rgb, max_rgb):
+		"""
+		Set min and max color for sound visualization.
+
+		Since API v2.1
+
+		:param min_rgb: Tuple of red, green, blue values (0 to 255) or
+		Colour object
+		:type min_rgb: tuple
+		:param max_rgb: Tuple of red, green, blue values (0 to 255) or
+		Colour object
+		:type max_rgb: tuple
+		"""
+		self._requireApi('setSoundVizColour')
+		await self._sendAndExpectOk('setsoundvizcolors:%s;%s' % (
+			self._colourDef(min_rgb), self._colourDef(max_rgb)))
+	setSoundVizColor = setSoundVizColour
+
+	async def enableSoundVizLiquid(self):
+		"""
+		Set sound visualization to liquid color mode.
+
+		Since API v2.1
+		"""
+		self._requireApi('enableSoundVizLiquid')
+		await self._sendAndExpectOk('setsoundvizliquid:on')
+
+	async def disableSoundVizLiquid(self):
+		"""
+		Disable sound visualization liquid color mode.
+
+		Since API v2.1
+		"""
+		self._requireApi('disableSoundVizLiquid')
+		await self._sendAndExpectOk('setsoundvizliquid:off')
+
+	async def setSession(self, key):
+		"""
+		Set the session key.
+
+		:param key: session guid
+		:type key: str
+		"""
+		await self._sendAndExpectOk('guid:%s' % key)
+
+	async def lock(self):
+		"""
+		Lock the Lightpack, thereby assuming control.
+		"""
+		await self._sendAndExpectSuccess('lock')
+
+	async def unlock(self):
+		"""
+		Unlock the Lightpack, thereby releasing control to other processes.
+		"""
+		await self._sendAndExpectSuccess('unlock')
+
+	async def persist(self):
+		"""
+		Set whether the last set colors should persist when unlocking.
+
+		Since API v2.2
+		"""
+		self._requireApi('persist')
+		await self._sendAndExpectOk('setpersistonunlock:on')
+
+	async def unpersist(self):
+		"""
+		Disable color persistence.
+
+		Since API v2.2
+		"""
+		self._requireApi('unpersist')
+		await self._sendAndExpectOk('setpersistonunlock:off')
+
+	async def _setStatus(self, status):
+		"""
+		Set the status to a given string.
+
+		:param status: status to set
+		:type status: str
+		"""
+		await self._sendAndExpectOk('setstatus:%s' % status)
+
+	async def turnOn(self):
+		"""
+		Turn the Lightpack on.
+		"""
+		await self._setStatus('on')
+
+	async def turnOff(self):
+		"""
+		Turn the Lightpack off.
+		"""
+		await self._setStatus('off')
+
+	async def disconnect(self):
+		"""
+		Unlock and disconnect from the Lightpack API.
+
+		This method calls the `unlock()` method before disconnecting but will
+		not fail if the Lightpack is already unlocked.
+		"""
+		try:
+			await self.unlock()
+		except (CommandFailedError, ConnectionError):
+			pass
+		if self._readerTask is not None:
+			self._readerTask.cancel()
+			self._readerTask = None
+		self._writer.close()
@@ -0,0 +1,288 @@
+"""
+Command line interface to the Lightpack, with an optional daemon.
+
+Each `lightpack` command otherwise connects, authenticates and locks before it
+can do anything. Run `lightpack daemon` to keep one connection open and locked,
+and later commands are passed to it over a Unix domain socket instead:
+
+	lightpack daemon --api-key secret &
+	lightpack set all 255,0,0
+	lightpack set 0 0,0,255 top-left 0,255,0
+	lightpack brightness 50
+
+A request is the command's words separated by spaces on one line, and the
+daemon answers each with one line: 'ok', a value, or 'error: ' and a message.
+Without a daemon, commands connect directly.
+
+The socket is `$LIGHTPACK_SOCKET`, or `lightpack.sock` in `$XDG_RUNTIME_DIR`, or
+`/tmp/lightpack-<uid>.sock`. Direct connections and the daemon use
+`$LIGHTPACK_HOST`, `$LIGHTPACK_PORT` and `$LIGHTPACK_API_KEY` unless given
+options.
+"""
+
+from __future__ import print_function
+
+# Sending a request to the daemon needs only these modules; lightpack itself
+# is imported only to connect directly or to run the daemon
+import os
+import socket
+import sys
+
+USAGE = """usage: lightpack COMMAND [ARGUMENT...]
+
+commands:
+  set LED|all R,G,B [LED R,G,B...]  set LED colours
+  get [LED]                         get one LED's colour, or every LED's
+  brightness|smoothness|gamma VALUE change a setting
+  profile|mode NAME                 change the profile or mode
+  on|off                            turn the LEDs on or off
+  status                            get the status
+  lock|unlock                       take or release control of the LEDs
+  daemon [--help]                   keep a connection open for other commands
+  stop                              stop the daemon"""
+
+def socketPath():
+	"""
+	Get the path of the daemon's socket.
+	"""
+	if 'LIGHTPACK_SOCKET' in os.environ:
+		return os.environ['LIGHTPACK_SOCKET']
+	if 'XDG_RUNTIME_DIR' in os.environ:
+		return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'lightpack.sock')
+	return '/tmp/lightpack-%d.sock' % os.getuid()
+
+def request(line, path=None):
+	"""
+	Send a request to the daemon.
+
+	:param line: request, without a trailing newline
+	:type line: str
+	:param path: daemon's socket (default `socketPath()`)
+	:type path: str
+	:returns: string response, or None if no daemon answered
+	"""
+	if not hasattr(socket, 'AF_UNIX'):
+		return None
+	connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		response = b''
+		try:
+			connection.connect(path or socketPath())
+			connection.sendall(line.encode('utf-8') + b'\n')
+			while not response.endswith(b'\n'):
+				data = connection.recv(4096)
+				if not data:
+					break
+				response += data
+		except socket.error:
+			pass
+		# A daemon which is stopping may accept a connection and close it
+		if not response:
+			return None
+		return response.decode('utf-8').rstrip('\n')
+	finally:
+		connection.close()
+
+def _led(word):
+	"""
+	Read an LED argument: a 0-based index, or an alias.
+	"""
+	return int(word) if word.isdigit() else word
+
+def _rgb(word):
+	"""
+	Read a colour argument such as '255,0,0'.
+	"""
+	rgb = tuple([int(x) for x in word.split(',')])
+	if len(rgb) != 3:
+		raise ValueError("Colour \"%s\" isn't R,G,B" % word)
+	return rgb
+
+def execute(lightpack, words):
+	"""
+	Carry out a request on a connected, locked Lightpack.
+
+	Raises a ValueError for an unknown or malformed request, and passes on
+	the Lightpack's errors.
+
+	:param lightpack: Lightpack to control
+	:type lightpack: Lightpack
+	:param words: request split into words
+	:type words: list
+	:returns: string response
+	"""
+	if not words:
+		raise ValueError("Empty request")
+	command, arguments = words[0], words[1:]
+	if command == 'set':
+		if not arguments or len(arguments) % 2:
+			raise ValueError("set takes pairs of LED and R,G,B")
+		pairs = [(arguments[i], _rgb(arguments[i + 1])) \
+				for i in range(0, len(arguments), 2)]
+		if pairs[0][0] == 'all' and len(pairs) == 1:
+			lightpack.setColourToAll(pairs[0][1])
+		else:
+			lightpack.setColours(*[(_led(led), rgb) for led, rgb in pairs])
+	elif command == 'get' and len(arguments) <= 1:
+		if arguments:
+			return '%d,%d,%d' % lightpack.getColour(_led(arguments[0]))
+		colours = lightpack.getColoursArray()
+		return ';'.join(['%d,%d,%d' % tuple(rgb) for rgb in colours])
+	elif command in ('brightness', 'smoothness') and len(arguments) == 1:
+		getattr(lightpack, 'set' + command.title())(int(arguments[0]))
+	elif command == 'gamma' and len(arguments) == 1:
+		lightpack.setGamma(float(arguments[0]))
+	elif command in ('profile', 'mode') and len(arguments) == 1:
+		getattr(lightpack, 'set' + command.title())(arguments[0])
+	elif command == 'on' and not arguments:
+		lightpack.turnOn()
+	elif command == 'off' and not arguments:
+		lightpack.turnOff()
+	elif command == 'status' and not arguments:
+		return lightpack.getStatus()
+	elif command in ('lock', 'unlock') and not arguments:
+		getattr(lightpack, command)()
+	else:
+		raise ValueError("Unknown request \"%s\"" % ' '.join(words))
+	return 'ok'
+
+def _respond(lightpack, line):
+	"""
+	Carry out a request line, turning any error into an error response.
+	"""
+	try:
+		return execute(lightpack, line.split())
+	except Exception as e:
+		return 'error: %s' % e
+
+def serve(lightpack, path=None):
+	"""
+	Answer requests on a Unix domain socket until a 'stop' request.
+
+	Requests from several clients are carried out one at a time.
+
+	:param lightpack: connected, locked Lightpack
+	:type lightpack: Lightpack
+	:param path: socket to listen on (default `socketPath()`)
+	:type path: str
+	"""
+	import threading
+	try:
+		import socketserver
+	except ImportError:
+		import SocketServer as socketserver
+	path = path or socketPath()
+	lock = threading.Lock()
+
+	class Handler(socketserver.StreamRequestHandler):
+		def handle(self):
+			for line in self.rfile:
+				line = line.decode('utf-8').strip()
+				if line == 'stop':
+					self.wfile.write(b'ok\n')
+					threading.Thread(target=server.shutdown).start()
+					return
+				with lock:
+					response = _respond(lightpack, line)
+				self.wfile.write(response.encode('utf-8') + b'\n')
+
+	class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+		daemon_threads = True
+
+	if os.path.exists(path):
+		if request('status', path) is not None:
+			raise RuntimeError("A daemon is already listening on %s" % path)
+		# Left behind by a daemon which didn't exit cleanly
+		os.unlink(path)
+	# Only this user may connect
+	umask = os.umask(0o077)
+	try:
+		server = Server(path, Handler)
+	finally:
+		os.umask(umask)
+	try:
+		server.serve_forever()
+	finally:
+		server.server_close()
+		os.unlink(path)
+
+def _connect(host=None, port=None, api_key=None, reconnect=False):
+	"""
+	Connect to and lock a Lightpack, taking unset options from the
+	environment.
+	"""
+	import lightpack
+	lp = lightpack.Lightpack(
+			host=host or os.environ.get('LIGHTPACK_HOST', 'localhost'),
+			port=int(port or os.environ.get('LIGHTPACK_PORT', 3636)),
+			api_key=api_key or os.environ.get('LIGHTPACK_API_KEY'),
+			reconnect=reconnect)
+	lp.connect()
+	lp.lock()
+	return lp
+
+def daemon(argv):
+	"""
+	Run the daemon, with command line arguments after 'daemon'.
+	"""
+	import argparse
+	parser = argparse.ArgumentParser(prog='lightpack daemon',
+			description="Keep a locked connection open for other lightpack " \
+			"commands")
+	parser.add_argument('--host')
+	parser.add_argument('--port', type=int)
+	parser.add_argument('--api-key')
+	parser.add_argument('--socket', help="socket to listen on (default %s)" \
+			% socketPath())
+	args = parser.parse_args(argv)
+	# Check before connecting, as the running daemon holds the lock
+	if request('status', args.socket) is not None:
+		print("error: a daemon is already listening on %s" % \
+				(args.socket or socketPath()), file=sys.stderr)
+		return 1
+	lp = _connect(args.host, args.port, args.api_key, reconnect=True)
+	try:
+		serve(lp, args.socket)
+	finally:
+		lp.disconnect()
+	return 0
+
+def main(argv=None):
+	"""
+	Run the `lightpack` command.
+
+	:param argv: arguments after the program name (default `sys.argv[1:]`)
+	:type argv: list
+	:returns: exit status
+	"""
+	if argv is None:
+		argv = sys.argv[1:]
+	if not argv or argv[0] in ('-h', '--help'):
+		print(USAGE)
+		return 0 if argv else 2
+	if argv[0] == 'daemon':
+		return daemon(argv[1:])
+	line = ' '.join(argv)
+	response = request(line)
+	if response is None:
+		if argv[0] == 'stop':
+			print("error: no daemon is running", file=sys.stderr)
+			return 1
+		try:
+			lp = _connect()
+		except Exception as e:
+			print("error: %s" % e, file=sys.stderr)
+			return 1
+		try:
+			response = _respond(lp, line)
+		finally:
+			lp.disconnect()
+	if response.startswith('error: '):
+		print(response, file=sys.stderr)
+		return 1
+	if response != 'ok':
+		print(response)
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,387 @@
+"""
+Mock Prismatik server speaking the Lightpack API.
+
+Useful for testing and benchmarking clients without a real Lightpack. Run it
+from the command line with `python -m lightpack_mock` or start it in-process:
+
+	with MockPrismatik(leds=30, latency=0.001) as server:
+		lp = lightpack.Lightpack(port=server.port)
+		lp.connect()
+"""
+
+from __future__ import print_function
+
+import threading
+import time
+try:
+	import queue
+	import socketserver
+except ImportError:
+	import Queue as queue
+	import SocketServer as socketserver
+
+class MockPrismatik:
+	"""
+	Threaded mock of the Prismatik API server
+
+	Each client connection is served by its own thread. All clients share the
+	same device state, so locking behaves as with a real server: while one
+	client holds the lock, the others get 'busy' from commands which need it.
+	"""
+
+	def __init__(self, host='127.0.0.1', port=0, leds=10, latency=0.0,
+			api_key=None, api_version='2.2'):
+		"""
+		Create a mock server. It doesn't listen until `start()` is called.
+
+		:param host: address to listen on (default 127.0.0.1)
+		:type host: str
+		:param port: port to listen on (default 0 -- any free port)
+		:type port: int
+		:param leds: number of LEDs (default 10)
+		:type leds: int
+		:param latency: seconds by which each response is delayed, like a 
+		network round trip; pipelined commands are delayed together (default 0)
+		:type latency: float
+		:param api_key: API key clients must give (default None -- no key)
+		:type api_key: str
+		:param api_version: API version to report (default '2.2')
+		:type api_version: str
+		"""
+		self.host = host
+		self.port = port
+		self.latency = latency
+		self.api_key = api_key
+		self.api_version = api_version
+		self.lock = threading.Lock()
+		self.lockOwner = None
+		self.commandCount = 0
+		self.status = 'on'
+		self.mode = 'ambilight'
+		self.profiles = ['Lightpack']
+		self.profile = 'Lightpack'
+		self.devices = ['Lightpack', 'Adalight', 'Ardulight', 'Virtual']
+		self.device = 'Lightpack'
+		self.brightness = 100
+		self.smoothness = 100
+		self.gamma = 2.0
+		self.fps = 25
+		self.persist = False
+		self.soundVizColours = ((0, 0, 0), (255, 255, 255))
+		self.soundVizLiquid = False
+		self.maxLeds = 255
+		self.screenSize = (0, 0, 1920, 1080)
+		self.monitors = [(0, 0, 1920, 1080)]
+		self.setCountLeds(leds)
+		self._server = None
+		self._thread = None
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.stop()
+
+	def setCountLeds(self, count):
+		"""
+		Change the number of LEDs, resetting their colours and sizes.
+
+		:param count: number of LEDs
+		:type count: int
+		"""
+		self.colours = [(0, 0, 0)] * count
+		self.sizes = [(i * 10, 0, 10, 10) for i in range(count)]
+
+	def start(self):
+		"""
+		Start listening in a background thread.
+		"""
+		self._server = _Server((self.host, self.port), _Handler)
+		self._server.mock = self
+		self.port = self._server.server_address[1]
+		self._thread = threading.Thread(target=self._server.serve_forever)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self):
+		"""
+		Stop listening and wait for the background thread to finish.
+		"""
+		self._server.shutdown()
+		self._server.server_close()
+		self._thread.join()
+		self._server = None
+
+	def greeting(self):
+		"""
+		Get the line sent to clients when they connect.
+		"""
+		return 'Lightpack API v%s (type "help" for more info)' % self.api_version
+
+	def handle(self, client, line):
+		"""
+		Get the response to one command line from a client.
+
+		:param client: client the command came from
+		:type client: _Client
+		:param line: command without its trailing newline
+		:type line: str
+		:returns: string response
+		"""
+		name, _, payload = line.partition(':')
+		with self.lock:
+			self.commandCount += 1
+			if name == 'apikey':
+				client.authorized = self.api_key is None or payload == self.api_key
+				return 'ok' if client.authorized else 'fail'
+			if not client.authorized:
+				return 'authorization required'
+			if name == 'getlockstatus':
+				return 'lockstatus:%s' % self._lockStatus(client)
+			getter = self._getters.get(name)
+			if getter is not None:
+				try:
+					value = getter(self, payload)
+				except (ValueError, IndexError, KeyError):
+					return 'error'
+				return '%s:%s' % (name[3:] if name.startswith('get') else name,
+						value)
+			if name == 'lock':
+				if self.lockOwner not in (None, client):
+					return 'lock:busy'
+				self.lockOwner = client
+				return 'lock:success'
+			if name == 'unlock':
+				if self.lockOwner is None:
+					return 'unlock:not locked'
+				if self.lockOwner is not client:
+					return 'unlock:busy'
+				self.lockOwner = None
+				return 'unlock:success'
+			if name == 'guid':
+				return 'ok'
+			setter = self._setters.get(name)
+			if setter is None:
+				return 'unknown command'
+			if self.lockOwner is None:
+				return 'not locked'
+			if self.lockOwner is not client:
+				return 'busy'
+			try:
+				setter(self, payload)
+			except (ValueError, IndexError, KeyError):
+				return 'error'
+			return 'ok'
+
+	def release(self, client):
+		"""
+		Release the lock if a disconnecting client holds it.
+
+		:param client: client which disconnected
+		:type client: _Client
+		"""
+		with self.lock:
+			if self.lockOwner is client:
+				self.lockOwner = None
+
+	def _lockStatus(self, client):
+		if self.lockOwner is None:
+			return 'no'
+		return 'ok' if self.lockOwner is client else 'busy'
+
+	def _setColours(self, payload):
+		colours = list(self.colours)
+		for snippet in payload.rstrip(';').split(';'):
+			led, rgb = snippet.split('-', 1)
+			rgb = tuple([int(x) for x in rgb.split(',')])
+			if len(rgb) != 3 or not all([0 <= x <= 255 for x in rgb]):
+				raise ValueError(snippet)
+			index = int(led) - 1
+			if index < 0:
+				raise IndexError(led)
+			colours[index] = rgb
+		self.colours = colours
+
+	def _setSizes(self, payload):
+		sizes = list(self.sizes)
+		for snippet in payload.rstrip(';').split(';'):
+			led, rectangle = snippet.split('-', 1)
+			rectangle = tuple([int(x) for x in rectangle.split(',')])
+			if len(rectangle) != 4:
+				raise ValueError(snippet)
+			index = int(led) - 1
+			if index < 0:
+				raise IndexError(led)
+			sizes[index] = rectangle
+		self.sizes = sizes
+
+	def _setRange(self, attribute, payload, low, high, cast=int):
+		value = cast(payload)
+		if not low <= value <= high:
+			raise ValueError(payload)
+		setattr(self, attribute, value)
+
+	def _setChoice(self, attribute, payload, choices):
+		if payload not in choices:
+			raise ValueError(payload)
+		setattr(self, attribute, payload)
+
+	def _newProfile(self, payload):
+		if not payload:
+			raise ValueError(payload)
+		if payload not in self.profiles:
+			self.profiles.append(payload)
+		self.profile = payload
+
+	def _deleteProfile(self, payload):
+		self.profiles.remove(payload)
+		if self.profile == payload:
+			self.profile = self.profiles[0] if self.profiles else ''
+
+	def _setSoundVizColours(self, payload):
+		colours = [tuple([int(x) for x in part.split(',')]) \
+				for part in payload.split(';')]
+		if len(colours) != 2 or [len(c) for c in colours] != [3, 3]:
+			raise ValueError(payload)
+		self.soundVizColours = tuple(colours)
+
+	def _setOnOff(self, attribute, payload):
+		if payload not in ('on', 'off'):
+			raise ValueError(payload)
+		setattr(self, attribute, payload == 'on')
+
+	# Getters map a command to its payload; the response name is the command
+	# name without its 'get' prefix
+	_getters = {
+		'getstatus': lambda self, p: self.status,
+		'getstatusapi': lambda self, p: \
+				'idle' if self.lockOwner is None else 'busy',
+		'getmode': lambda self, p: self.mode,
+		'getprofile': lambda self, p: self.profile,
+		'getprofiles': lambda self, p: ''.join(['%s;' % x for x in self.profiles]),
+		'getdevice': lambda self, p: self.device,
+		'getdevices': lambda self, p: ''.join(['%s;' % x for x in self.devices]),
+		'getfps': lambda self, p: self.fps,
+		'getbrightness': lambda self, p: self.brightness,
+		'getsmooth': lambda self, p: self.smoothness,
+		'getgamma': lambda self, p: '%.2f' % self.gamma,
+		'getcountleds': lambda self, p: len(self.colours),
+		'getmaxleds': lambda self, p: self.maxLeds,
+		'getcolors': lambda self, p: ''.join(['%d-%d,%d,%d;' % \
+				((i + 1,) + c) for i, c in enumerate(self.colours)]),
+		'getleds': lambda self, p: ''.join(['%d-%d,%d,%d,%d;' % \
+				((i,) + r) for i, r in enumerate(self.sizes)]),
+		'getscreensize': lambda self, p: '%d,%d,%d,%d' % self.screenSize,
+		'countmonitors': lambda self, p: len(self.monitors),
+		'getsizemonitor': lambda self, p: '%d,%d,%d,%d' % \
+				self.monitors[int(p)],
+		'getpersistonunlock': lambda self, p: \
+				'on' if self.persist else 'off',
+		'getsoundvizcolors': lambda self, p: '%d,%d,%d;%d,%d,%d' % \
+				(self.soundVizColours[0] + self.soundVizColours[1]),
+		'getsoundvizliquid': lambda self, p: \
+				'1' if self.soundVizLiquid else '',
+	}
+
+	# Setters apply a payload and may raise ValueError for an 'error' response
+	_setters = {
+		'setcolor': _setColours,
+		'setleds': _setSizes,
+		'setstatus': lambda self, p: self._setChoice('status', p,
+				('on', 'off')),
+		'setmode': lambda self, p: self._setChoice('mode', p,
+				('ambilight', 'moodlamp', 'soundviz')),
+		'setprofile': lambda self, p: self._setChoice('profile', p,
+				self.profiles),
+		'newprofile': _newProfile,
+		'deleteprofile': _deleteProfile,
+		'setdevice': lambda self, p: self._setChoice('device', p,
+				self.devices),
+		'setbrightness': lambda self, p: self._setRange('brightness', p,
+				0, 100),
+		'setsmooth': lambda self, p: self._setRange('smoothness', p, 0, 255),
+		'setgamma': lambda self, p: self._setRange('gamma', p, 0.01, 10.0,
+				float),
+		'setcountleds': lambda self, p: self.setCountLeds(int(p)),
+		'setpersistonunlock': lambda self, p: self._setOnOff('persist', p),
+		'setsoundvizcolors': _setSoundVizColours,
+		'setsoundvizliquid': lambda self, p: self._setOnOff('soundVizLiquid',
+				p),
+	}
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+	allow_reuse_address = True
+	daemon_threads = True
+
+class _Client:
+	"""
+	State of one connected client.
+	"""
+
+	def __init__(self, authorized):
+		self.authorized = authorized
+
+class _Handler(socketserver.StreamRequestHandler):
+	"""
+	Serve one client connection, one command per line.
+
+	Responses are written by a separate thread once their latency has passed, 
+	so commands arriving together are answered together.
+	"""
+
+	disable_nagle_algorithm = True
+
+	def handle(self):
+		mock = self.server.mock
+		client = _Client(mock.api_key is None)
+		responses = queue.Queue()
+		writer = threading.Thread(target=self._write, args=(responses,))
+		writer.daemon = True
+		writer.start()
+		try:
+			responses.put((0, mock.greeting()))
+			for line in self.rfile:
+				due = time.time() + mock.latency
+				command = line.decode('utf-8').rstrip('\r\n')
+				responses.put((due, mock.handle(client, command)))
+		except (IOError, OSError):
+			pass
+		finally:
+			responses.put(None)
+			writer.join()
+			mock.release(client)
+
+	def _write(self, responses):
+		while True:
+			item = responses.get()
+			if item is None:
+				return
+			due, response = item
+			delay = due - time.time()
+			if delay > 0:
+				time.sleep(delay)
+			try:
+				self.wfile.write(str.encode(response + '\r\n'))
+			except (IOError, OSError):
+				pass
+
+if __name__ == '__main__':
+	import argparse
+	parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=3636)
+	parser.add_argument('--leds', type=int, default=10)
+	parser.add_argument('--latency', type=float, default=0.0,
+			help="seconds by which each response is delayed")
+	parser.add_argument('--api-key')
+	args = parser.parse_args()
+	server = MockPrismatik(host=args.host, port=args.port, leds=args.leds,
+			latency=args.latency, api_key=args.api_key)
+	server.start()
+	print("Listening on %s:%d" % (args.host, server.port))
+	try:
+		while True:
+			time.sleep(3600)
+	except KeyboardInterrupt:
+		server.stop()
@@ -0,0 +1,164 @@
+"""
+Sample LED colours from images, as Prismatik does from the screen.
+
+A `ZoneSampler` averages the colour inside each LED's capture rectangle (see
+`Lightpack.getLedSizes()`) of any image, such as a decoded video frame, so a
+Lightpack can follow sources other than the screen:
+
+	sampler = ZoneSampler.fromLightpack(lp)
+	for image in frames:
+		lp.pushFrame(sampler.sample(image))
+
+Requires NumPy.
+"""
+
+from __future__ import division
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+class ZoneSampler:
+	"""
+	Average colours of LED capture rectangles in images
+
+	The rectangles are scaled from the canvas they were defined on (normally
+	the screen) to each image's size. Everything depending only on the layout
+	and image size is computed once and cached, so each frame costs one
+	pass over the image for a summed-area table and a few array operations
+	per LED, or with `grid` set, a fixed number of pixel reads per LED
+	whatever the image size.
+	"""
+
+	def __init__(self, sizes, canvas, grid=None):
+		"""
+		Create a sampler for a layout of LEDs.
+
+		:param sizes: LED rectangles, as returned by `Lightpack.getLedSizes()`
+		:type sizes: dict
+		:param canvas: rectangle the LED rectangles are relative to, as
+		returned by `Lightpack.getScreenSize()`
+		:type canvas: tuple
+		:param grid: if given, average this many by this many evenly spaced
+		pixels in each rectangle instead of every pixel (default None)
+		:type grid: int
+		"""
+		if numpy is None:
+			raise ImportError("ZoneSampler requires NumPy")
+		self.rectangles = numpy.array([sizes[led] for led in sorted(sizes)],
+				dtype=numpy.float64).reshape(-1, 4)
+		self.canvas = tuple(canvas)
+		self.grid = grid
+		self._layouts = {}
+
+	@classmethod
+	def fromLightpack(cls, lightpack, monitor=None, grid=None):
+		"""
+		Create a sampler for a Lightpack's current LED layout.
+
+		:param lightpack: connected Lightpack
+		:type lightpack: Lightpack
+		:param monitor: 0-based monitor whose area images show (default None
+		-- the whole screen)
+		:type monitor: int
+		:param grid: see the constructor
+		:type grid: int
+		"""
+		if monitor is None:
+			canvas = lightpack.getScreenSize()
+		else:
+			canvas = lightpack.getMonitorSize(monitor)
+		return cls(lightpack.getLedSizes(), canvas, grid)
+
+	def __len__(self):
+		return len(self.rectangles)
+
+	def _bounds(self, height, width):
+		"""
+		Get each rectangle's pixel bounds in an image of the given size.
+
+		:returns: tuple of x0, y0, x1, y1 arrays, clipped to the image
+		"""
+		cx, cy, cw, ch = self.canvas
+		sx, sy = width / cw, height / ch
+		x, y, w, h = self.rectangles.T
+		x0 = numpy.clip(numpy.floor((x - cx) * sx), 0, width)
+		y0 = numpy.clip(numpy.floor((y - cy) * sy), 0, height)
+		x1 = numpy.clip(numpy.ceil((x + w - cx) * sx), 0, width)
+		y1 = numpy.clip(numpy.ceil((y + h - cy) * sy), 0, height)
+		return [a.astype(numpy.intp) for a in (x0, y0, x1, y1)]
+
+	def _layout(self, height, width):
+		"""
+		Get the cached precomputed layout for an image size.
+		"""
+		key = height, width
+		if key not in self._layouts:
+			x0, y0, x1, y1 = self._bounds(height, width)
+			area = (x1 - x0) * (y1 - y0)
+			if self.grid is None:
+				# The summed-area table is only needed on rows where
+				# rectangles start or end
+				rows = numpy.unique(numpy.concatenate(([0, height], y0, y1)))
+				layout = rows, x0, numpy.searchsorted(rows, y0), x1, \
+						numpy.searchsorted(rows, y1), \
+						numpy.maximum(area, 1)[:, None]
+			else:
+				# Centres of grid cells spanning each rectangle
+				steps = (numpy.arange(self.grid) + 0.5) / self.grid
+				xs = x0[:, None] + (x1 - x0)[:, None] * steps
+				ys = y0[:, None] + (y1 - y0)[:, None] * steps
+				xs = numpy.clip(xs.astype(numpy.intp), 0, width - 1)
+				ys = numpy.clip(ys.astype(numpy.intp), 0, height - 1)
+				layout = xs, ys
+			self._layouts[key] = layout, area == 0
+		return self._layouts[key]
+
+	def sample(self, image):
+		"""
+		Get the average colour of each LED's rectangle of an image.
+
+		LEDs whose rectangles lie outside the image are black.
+
+		:param image: (height, width, 3) RGB image
+		:type image: array
+		:returns: (N, 3) uint8 array, one row per LED in order, ready for
+		`Lightpack.pushFrame()` or `Lightpack.setColoursArray()`
+		"""
+		image = numpy.asarray(image)
+		height, width = image.shape[:2]
+		layout, empty = self._layout(height, width)
+		if self.grid is None:
+			rows, x0, y0, x1, y1, area = layout
+			table = self._summedAreaTable(image, rows)
+			sums = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+			colours = sums / area
+		else:
+			xs, ys = layout
+			colours = image[ys[:, :, None], xs[:, None, :]].mean(axis=(1, 2))
+		colours = numpy.rint(colours).astype(numpy.uint8)
+		colours[empty] = 0
+		return colours
+
+	def _summedAreaTable(self, image, rows):
+		"""
+		Get rows of the summed-area table of an image.
+
+		Entry (i, x) is the sum of the pixels above `rows[i]` and left of x.
+		Each band of the image between consecutive rows is summed once, so the
+		table costs one pass over the image, without building it for every
+		row.
+
+		:param rows: sorted row numbers, starting with 0 and ending with the
+		image height
+		:type rows: array
+		"""
+		height, width, depth = image.shape
+		table = numpy.zeros((len(rows), width + 1, depth), dtype=numpy.int64)
+		for i in range(1, len(rows)):
+			table[i, 1:] = image[rows[i - 1]:rows[i]].sum(axis=0,
+					dtype=numpy.int64)
+		numpy.cumsum(table, axis=0, out=table)
+		numpy.cumsum(table, axis=1, out=table)
+		return table
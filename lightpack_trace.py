@@ -0,0 +1,245 @@
+"""
+Record and replay the wire traffic of a Lightpack session.
+
+A `TraceRecorder` captures every command a `Lightpack` sends and every response
+it reads, timestamped, to a trace file. `replay()` sends the recorded commands
+to a server again, either at their original timing or as fast as the server
+answers, so the throughput of the client or the server can be compared run
+against run:
+
+	with TraceRecorder(lp, 'session.lptr'):
+		lp.connect()
+		...
+
+	print(replay('session.lptr', port=3636, fast=True))
+
+or from the command line with `python -m lightpack_trace session.lptr --fast`.
+
+A trace file is an 8-byte header, the magic bytes 'LPTR' then the format
+version as an unsigned little-endian 32-bit integer (currently 1), followed by
+a record for each send or read. Each record is, in little-endian order:
+
+- the direction, a byte: SENT (0) or RECEIVED (1)
+- seconds since recording started, 64-bit float
+- length of the data, unsigned 32-bit
+- the data: bytes exactly as sent, or a response without its trailing CRLF
+"""
+
+from __future__ import division, print_function
+
+import socket
+import struct
+import time
+
+from lightpack import Lightpack, Protocol, _clock
+
+MAGIC = b'LPTR'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sI')
+RECORD = struct.Struct('<BdI')
+
+SENT = 0
+RECEIVED = 1
+
+class TraceRecorder:
+	"""
+	Record a Lightpack's commands and responses to a trace file
+
+	Recording hooks the Lightpack's `_write` and `_readEvent`, so what is
+	recorded is exactly what crosses the wire, pipelined batches and all.
+	"""
+
+	def __init__(self, lightpack, path):
+		"""
+		Start recording. Record before connecting to include the greeting.
+
+		:param lightpack: Lightpack to record
+		:type lightpack: Lightpack
+		:param path: trace file to write, replacing any existing one
+		:type path: str
+		"""
+		self.lightpack = lightpack
+		self.records = 0
+		self._file = open(path, 'wb')
+		self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+		self._start = _clock()
+		write = lightpack._write
+		readEvent = lightpack._readEvent
+
+		def recordedWrite(data):
+			# The encoder reuses its buffer, so copy it before sending
+			self._write(SENT, bytes(data))
+			write(data)
+
+		def recordedReadEvent():
+			event = readEvent()
+			self._write(RECEIVED, event.text.encode('utf-8'))
+			return event
+
+		lightpack._write = recordedWrite
+		lightpack._readEvent = recordedReadEvent
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def _write(self, direction, data):
+		self._file.write(RECORD.pack(direction, _clock() - self._start,
+				len(data)))
+		self._file.write(data)
+		self.records += 1
+
+	def close(self):
+		"""
+		Stop recording and close the trace file.
+		"""
+		del self.lightpack._write
+		del self.lightpack._readEvent
+		self._file.close()
+
+def readTrace(path):
+	"""
+	Read the records of a trace file.
+
+	Raises a ValueError if the file isn't a valid trace.
+
+	:param path: trace file to read
+	:type path: str
+	:returns: list of (direction, seconds, data) tuples
+	"""
+	with open(path, 'rb') as f:
+		data = f.read()
+	if len(data) < HEADER.size or HEADER.unpack_from(data) != (MAGIC,
+			FORMAT_VERSION):
+		raise ValueError("%s isn't a version %d trace" % (path, FORMAT_VERSION))
+	records = []
+	offset = HEADER.size
+	while offset < len(data):
+		if offset + RECORD.size > len(data):
+			raise ValueError("%s is truncated" % path)
+		direction, seconds, length = RECORD.unpack_from(data, offset)
+		offset += RECORD.size
+		if offset + length > len(data):
+			raise ValueError("%s is truncated" % path)
+		records.append((direction, seconds, data[offset:offset + length]))
+		offset += length
+	return records
+
+class ReplayResult:
+	"""
+	Outcome of replaying a trace
+
+	`elapsed` is the seconds from reading the greeting to the last response,
+	and `recordedElapsed` the same for the original session, timed from its
+	first record after any greeting. `commands`, `sent` and `received` count the commands and
+	the bytes each way. `mismatches` counts responses which differed from
+	those recorded, such as colours read back from a server in a different
+	state.
+	"""
+
+	def __init__(self, elapsed, recordedElapsed, commands, sent, received,
+			mismatches):
+		self.elapsed = elapsed
+		self.recordedElapsed = recordedElapsed
+		self.commands = commands
+		self.sent = sent
+		self.received = received
+		self.mismatches = mismatches
+
+	@property
+	def commandsPerSecond(self):
+		"""
+		Commands replayed per second.
+		"""
+		return self.commands / self.elapsed if self.elapsed else 0.0
+
+	def __repr__(self):
+		return "<ReplayResult %d commands in %.3fs (recorded %.3fs), " \
+				"%.0f/s, %d mismatches>" % (self.commands, self.elapsed,
+				self.recordedElapsed, self.commandsPerSecond, self.mismatches)
+
+def _readEvent(connection, protocol):
+	"""
+	Read from a socket until a Protocol has parsed the next event.
+	"""
+	event = protocol.nextEvent()
+	while event is None:
+		data = connection.recv(Lightpack.readSize)
+		if not data:
+			raise socket.error("Connection closed by server")
+		protocol.receive(data)
+		event = protocol.nextEvent()
+	return event
+
+def replay(path, host='localhost', port=3636, fast=False):
+	"""
+	Replay a trace's commands to a server.
+
+	Commands are sent in the recorded batches, and each response is read where
+	it was originally read, so pipelining is reproduced. The server's greeting
+	is read but neither counted nor compared, whether or not the trace was
+	recorded from before connecting.
+
+	:param path: trace file to replay
+	:type path: str
+	:param host: server's host (default 'localhost')
+	:type host: str
+	:param port: server's port (default 3636)
+	:type port: int
+	:param fast: send each batch as soon as the previous responses are read,
+	rather than at its recorded time (default False)
+	:type fast: boolean
+	:returns: ReplayResult
+	"""
+	records = readTrace(path)
+	connection = socket.create_connection((host, port))
+	connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+	# Responses are framed by a Protocol; the commands needn't be registered 
+	# with it, since they're compared by position rather than by command
+	protocol = Protocol()
+	commands = sent = received = mismatches = 0
+	if records and records[0][0] == RECEIVED:
+		# Nothing precedes the greeting, so only it can be received first
+		records = records[1:]
+	origin = records[0][1] if records else 0.0
+	try:
+		while protocol.greeting is None:
+			_readEvent(connection, protocol)
+		start = _clock()
+		for direction, seconds, data in records:
+			if direction == SENT:
+				if not fast:
+					delay = seconds - origin - (_clock() - start)
+					if delay > 0:
+						time.sleep(delay)
+				connection.sendall(data)
+				commands += data.count(b'\n')
+				sent += len(data)
+			else:
+				response = _readEvent(connection, protocol).text.encode('utf-8')
+				received += len(response) + 2
+				if response != data:
+					mismatches += 1
+		elapsed = _clock() - start
+	finally:
+		connection.close()
+	recordedElapsed = records[-1][1] - origin if records else 0.0
+	return ReplayResult(elapsed, recordedElapsed, commands, sent, received,
+			mismatches)
+
+if __name__ == '__main__':
+	import argparse
+
+	parser = argparse.ArgumentParser(description="Replay a Lightpack trace")
+	parser.add_argument('trace', help="trace file to replay")
+	parser.add_argument('--host', default='localhost')
+	parser.add_argument('--port', type=int, default=3636)
+	parser.add_argument('--fast', action='store_true',
+			help="don't wait for the recorded timing")
+	parser.add_argument('--repeat', type=int, default=1,
+			help="number of times to replay")
+	args = parser.parse_args()
+	for _ in range(args.repeat):
+		print(replay(args.trace, args.host, args.port, args.fast))
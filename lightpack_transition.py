@@ -0,0 +1,279 @@
+"""
+Client-side colour transitions for the Lightpack.
+
+Prismatik's smoothness setting applies one smoothing to every LED. A `Fader`
+instead fades each LED to its own target colour over its own duration with an
+easing curve, streaming the intermediate frames to the Lightpack:
+
+	fader = Fader(lp, fps=60)
+	fader.fadeTo({0: (255, 0, 0), 'top-left': (0, 0, 255)}, 0.5, 'ease-in-out')
+	fader.start()
+
+Intermediate frames are computed in batches, with NumPy if it is installed.
+"""
+
+from __future__ import division
+
+import threading
+import time
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Easing curves map progress from 0 to 1 onto the fraction of the colour
+# change made; they work on floats and NumPy arrays alike
+EASINGS = {
+	'linear': lambda p: p,
+	'ease-in': lambda p: p * p,
+	'ease-out': lambda p: p * (2 - p),
+	'ease-in-out': lambda p: p * p * (3 - 2 * p),
+}
+
+class Fader:
+	"""
+	Per-LED colour transitions streamed to a Lightpack
+
+	Each LED fades from its colour when `fadeTo` was called to its target.
+	Calling `fadeTo` again for an LED which is still fading starts the new
+	fade from wherever it had got to, so retargeting never jumps.
+
+	While the fader is running, only its thread uses the Lightpack, so
+	don't use the Lightpack from other threads meanwhile unless it is a
+	`ThreadedLightpack`. LEDs, aliases and groups are resolved as they were
+	when the fader was created.
+	"""
+
+	def __init__(self, lightpack, fps=60, batch=8):
+		"""
+		Create a fader. The LEDs' current colours are read from the Lightpack.
+
+		:param lightpack: connected and locked Lightpack
+		:type lightpack: Lightpack
+		:param fps: frames per second to send while fading (default 60)
+		:type fps: float
+		:param batch: number of frames to compute at once (default 8)
+		:type batch: int
+		"""
+		self.lightpack = lightpack
+		self.fps = fps
+		self.batch = batch
+		self._easings = list(EASINGS.values())
+		self._lock = threading.Lock()
+		self._generation = 0
+		self._running = False
+		self._thread = None
+		colours = lightpack.getColoursArray()
+		self.count = len(colours)
+		# Resolved once here, since resolving may send commands, which would
+		# clash with frames sent by the fader's thread
+		self._index = dict(lightpack._ledIndexMap())
+		now = time.time()
+		if numpy is not None:
+			self._from = numpy.asarray(colours, dtype=numpy.float64)
+			self._to = self._from.copy()
+			self._start = numpy.full(self.count, now)
+			self._duration = numpy.zeros(self.count)
+			self._easing = numpy.zeros(self.count, dtype=numpy.intp)
+		else:
+			self._from = [tuple(float(c) for c in rgb) for rgb in colours]
+			self._to = list(self._from)
+			self._start = [now] * self.count
+			self._duration = [0.0] * self.count
+			self._easing = [0] * self.count
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.stop()
+
+	def _ledIndices(self, led):
+		"""
+		Get the 0-based indices of an LED, alias or group alias.
+		"""
+		try:
+			return [i - 1 for i in self._index[led]]
+		except (KeyError, TypeError):
+			self.lightpack._ledIndexError(led, self.count)
+
+	def _easingIndex(self, easing):
+		"""
+		Get the index of an easing curve, given by name or as a function.
+		"""
+		easing = EASINGS.get(easing, easing)
+		if not callable(easing):
+			raise ValueError("Unknown easing \"%s\"" % easing)
+		if easing not in self._easings:
+			self._easings.append(easing)
+		return self._easings.index(easing)
+
+	def fadeTo(self, targets, duration, easing='linear'):
+		"""
+		Start fading LEDs to new colours.
+
+		:param targets: colours for LEDs 0 onwards, or a dictionary of colours
+		keyed by 0-based LED index, alias or group alias
+		:type targets: list, dict or (N, 3) array
+		:param duration: seconds the fade takes, or a dictionary of durations
+		keyed like `targets`
+		:type duration: float or dict
+		:param easing: name of a curve in EASINGS, or a function mapping
+		progress from 0 to 1 onto the fraction of the change made (default
+		'linear')
+		:type easing: str or callable
+		"""
+		if isinstance(targets, dict):
+			items = targets.items()
+		else:
+			items = enumerate(targets)
+		easing = self._easingIndex(easing)
+		with self._lock:
+			now = time.time()
+			current = self._colours([now])[0]
+			for led, rgb in items:
+				seconds = duration[led] if isinstance(duration, dict) \
+						else duration
+				for i in self._ledIndices(led):
+					self._from[i] = tuple(current[i])
+					self._to[i] = tuple(rgb)
+					self._start[i] = now
+					self._duration[i] = seconds
+					self._easing[i] = easing
+			self._generation += 1
+
+	def cancel(self, leds=None):
+		"""
+		Stop fading LEDs, leaving them at their current colours.
+
+		:param leds: LEDs to stop (default None -- all of them)
+		:type leds: list
+		"""
+		with self._lock:
+			now = time.time()
+			current = self._colours([now])[0]
+			if leds is None:
+				indices = range(self.count)
+			else:
+				indices = [i for led in leds for i in self._ledIndices(led)]
+			for i in indices:
+				self._from[i] = self._to[i] = tuple(current[i])
+				self._duration[i] = 0
+			self._generation += 1
+
+	def _colours(self, times):
+		"""
+		Compute the colours of every LED at each of several times.
+
+		:param times: times as returned by `time.time()`
+		:type times: list
+		:returns: (B, N, 3) array of floats, or a list of lists of tuples 
+		without NumPy
+		"""
+		if numpy is not None:
+			times = numpy.asarray(times, dtype=numpy.float64)[:, None]
+			elapsed = times - self._start
+			with numpy.errstate(divide='ignore', invalid='ignore'):
+				progress = numpy.where(self._duration > 0,
+						elapsed / self._duration, 1.0)
+			progress = numpy.clip(progress, 0.0, 1.0)
+			eased = numpy.empty_like(progress)
+			for index in numpy.unique(self._easing):
+				mask = self._easing == index
+				eased[:, mask] = self._easings[index](progress[:, mask])
+			return self._from + (self._to - self._from) * eased[:, :, None]
+		frames = []
+		for t in times:
+			frame = []
+			for i in range(self.count):
+				if self._duration[i] > 0:
+					p = min(max((t - self._start[i]) / self._duration[i], 0.0),
+							1.0)
+				else:
+					p = 1.0
+				fraction = self._easings[self._easing[i]](p)
+				start, end = self._from[i], self._to[i]
+				frame.append(tuple([a + (b - a) * fraction \
+						for a, b in zip(start, end)]))
+			frames.append(frame)
+		return frames
+
+	def frame(self, now=None):
+		"""
+		Get the colours of every LED at a given time.
+
+		:param now: time as returned by `time.time()` (default now)
+		:type now: float
+		:returns: (N, 3) uint8 array, or list of tuples without NumPy
+		"""
+		with self._lock:
+			return self._round(self._colours([now or time.time()]))[0]
+
+	def _round(self, frames):
+		"""
+		Round computed frames to whole colour values.
+		"""
+		if numpy is not None:
+			return numpy.rint(frames).astype(numpy.uint8)
+		return [[tuple([int(round(c)) for c in rgb]) for rgb in frame] \
+				for frame in frames]
+
+	@property
+	def done(self):
+		"""
+		Whether every fade has finished.
+		"""
+		with self._lock:
+			now = time.time()
+			return all([start + duration <= now for start, duration in \
+					zip(self._start, self._duration)])
+
+	def start(self):
+		"""
+		Start streaming frames to the Lightpack from a background thread.
+		"""
+		if self._thread is not None:
+			raise RuntimeError("The fader is already running")
+		self._running = True
+		self._thread = threading.Thread(target=self._loop)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self):
+		"""
+		Stop streaming frames. Fades are left where they were.
+		"""
+		self._running = False
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+	def wait(self):
+		"""
+		Block until every fade has finished and its last frame is sent.
+		"""
+		while self._running and not self.done:
+			time.sleep(1 / self.fps)
+		time.sleep(2 / self.fps)
+
+	def _loop(self):
+		period = 1 / self.fps
+		slot = time.time()
+		while self._running:
+			with self._lock:
+				generation = self._generation
+				times = [slot + i * period for i in range(self.batch)]
+				frames = self._round(self._colours(times))
+			for t, frame in zip(times, frames):
+				delay = t - time.time()
+				if delay > 0:
+					time.sleep(delay)
+				# Sent under the lock, so a fade started meanwhile never has a 
+				# stale frame sent after it
+				with self._lock:
+					if not self._running or generation != self._generation:
+						break
+					self.lightpack.pushFrame(frame)
+				slot = max(t + period, time.time())
@@ -15,5 +15,10 @@ setup(name=lightpack.NAME,
 		author_email=lightpack.AUTHOR_EMAIL,
 		url=lightpack.URL,
 		license=lightpack.LICENSE,
-		py_modules=['lightpack']
+		py_modules=['lightpack', 'lightpack_async', 'lightpack_mock',
+			'lightpack_transition', 'lightpack_animation', 'lightpack_sampler',
+			'lightpack_trace', 'lightpack_cli'],
+		entry_points={
+			'console_scripts': ['lightpack = lightpack_cli:main'],
+		}
 		)
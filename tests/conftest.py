@@ -0,0 +1,22 @@
+"""
+Fixtures shared by the tests, which run against `lightpack_mock.MockPrismatik`
+rather than a real Lightpack.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+		'..'))
+
+from lightpack_mock import MockPrismatik
+
+@pytest.fixture
+def server():
+	"""
+	Mock server with five LEDs, listening on a free port.
+	"""
+	with MockPrismatik(leds=5) as server:
+		yield server
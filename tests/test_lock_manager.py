@@ -0,0 +1,62 @@
+"""
+Tests of waiting for the lock through a LockManager.
+"""
+
+import threading
+import time
+
+import pytest
+
+import lightpack
+
+def connected(server, count):
+	lps = [lightpack.Lightpack(port=server.port) for _ in range(count)]
+	for lp in lps:
+		lp.connect()
+	return lps
+
+def testWaitersAreServedByPriorityThenArrival(server):
+	holder, first, second, urgent = connected(server, 4)
+	holder.lock()
+	order = []
+
+	def wait(lp, priority):
+		with lp.locked(timeout=5, priority=priority):
+			order.append(lp)
+
+	threads = []
+	for lp, priority in ((first, 0), (second, 0), (urgent, 1)):
+		threads.append(threading.Thread(target=wait, args=(lp, priority)))
+		threads[-1].start()
+		time.sleep(0.05)
+	holder.unlock()
+	for thread in threads:
+		thread.join()
+	assert order == [urgent, first, second]
+	for lp in (holder, first, second, urgent):
+		lp.disconnect()
+
+def testTimeout(server):
+	holder, waiter = connected(server, 2)
+	holder.lock()
+	with pytest.raises(lightpack.LockTimeoutError):
+		waiter.acquireLock(timeout=0.2)
+	assert waiter.lockStats['timeouts'] == 1
+	holder.disconnect()
+	assert waiter.acquireLock(timeout=1) >= 0
+	waiter.disconnect()
+
+def testHolderDroppedWithoutUnlocking(server):
+	holder, waiter = connected(server, 2)
+	holder.acquireLock()
+	waited = []
+	thread = threading.Thread(target=lambda: waited.append(
+			waiter.acquireLock()))
+	thread.start()
+	time.sleep(0.1)
+	# The server releases the lock, but nothing tells the manager
+	holder.connection.close()
+	thread.join(3)
+	assert not thread.is_alive()
+	assert len(waited) == 1
+	waiter.disconnect()
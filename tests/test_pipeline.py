@@ -0,0 +1,64 @@
+"""
+Tests of pipelines and of the colours remembered by `pushFrame`.
+"""
+
+import pytest
+
+import lightpack
+
+@pytest.fixture
+def lp(server):
+	lp = lightpack.Lightpack(port=server.port)
+	lp.connect()
+	lp.lock()
+	yield lp
+	lp.disconnect()
+
+def testPipelineSendsInOneWrite(lp, server, monkeypatch):
+	lp.getCountLeds()
+	writes = []
+	write = lp._write
+	monkeypatch.setattr(lp, '_write', lambda data: writes.append(bytes(data)) \
+			or write(data))
+	with lp.pipeline():
+		lp.setBrightness(40)
+		lp.setColour(0, (1, 2, 3))
+		lp.setGamma(1.5)
+	assert writes == [b'setbrightness:40\nsetcolor:1-1,2,3\nsetgamma:1.5\n']
+	assert (server.brightness, server.colours[0], server.gamma) == \
+			(40, (1, 2, 3), 1.5)
+
+def testPipelineRaisesFirstFailureAfterReadingEveryResponse(lp, server):
+	with pytest.raises(lightpack.CommandFailedError) as raised:
+		with lp.pipeline():
+			lp.setBrightness(500)
+			lp.setGamma(50)
+			lp.setSmoothness(10)
+	assert raised.value.command == 'setbrightness:500'
+	assert server.smoothness == 10
+	# The connection is still in step
+	assert lp.getBrightness() == 100
+
+def testFailedColoursAreForgotten(lp):
+	lp.pushFrame([(1, 1, 1)] * 5)
+	with pytest.raises(lightpack.CommandFailedError):
+		with lp.pipeline():
+			lp.setBrightness(500)
+			lp.setColour(0, (300, 0, 0))
+	assert lp.pushFrame([(1, 1, 1)] * 5) == 5
+
+def testPushFrameSendsOnlyChanges(lp, server):
+	assert lp.pushFrame([(1, 1, 1)] * 5) == 5
+	assert lp.pushFrame([(1, 1, 1)] * 4 + [(2, 2, 2)]) == 1
+	assert server.colours[4] == (2, 2, 2)
+
+def testUnlockedColoursAreForgotten(server):
+	lp = lightpack.Lightpack(port=server.port)
+	lp.connect()
+	try:
+		with pytest.raises(lightpack.CommandFailedError):
+			lp.pushFrame([(1, 1, 1)] * 5)
+		lp.lock()
+		assert lp.pushFrame([(1, 1, 1)] * 5) == 5
+	finally:
+		lp.disconnect()
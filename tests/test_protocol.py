@@ -0,0 +1,111 @@
+"""
+Tests of the sans-IO Protocol: framing, expectations and payload parsing.
+"""
+
+import random
+
+import pytest
+
+import lightpack
+from lightpack import Protocol
+
+GREETING = b'Lightpack API v2.2 (type "help" for more info)\r\n'
+
+def readColoursBySnippet(payload):
+	return dict([Protocol.readColour(snippet) \
+			for snippet in Protocol.readList(payload)])
+
+def readRectanglesBySnippet(payload):
+	return dict([Protocol.readRectangle(snippet) \
+			for snippet in Protocol.readList(payload)])
+
+def colourPayload(count):
+	return ''.join(['%d-%d,%d,%d;' % (i + 1, random.randint(0, 255),
+			random.randint(0, 255), random.randint(0, 255)) \
+			for i in range(count)])
+
+def rectanglePayload(count, left=0):
+	return ''.join(['%d-%d,%d,%d,%d;' % (i, random.randint(left, 3840),
+			random.randint(0, 2160), random.randint(1, 500),
+			random.randint(1, 500)) for i in range(count)])
+
+def mutate(payload):
+	"""
+	Change a payload in a few random places.
+	"""
+	characters = list(payload)
+	for _ in range(random.randint(1, 3)):
+		position = random.randint(0, len(characters))
+		character = random.choice('0123456789-,;; +x')
+		if random.random() < 0.5 or not characters:
+			characters.insert(position, character)
+		else:
+			characters[position - 1] = character
+	return ''.join(characters)
+
+def outcome(parse, payload):
+	try:
+		return parse(payload)
+	except Exception as e:
+		return type(e), str(e)
+
+@pytest.mark.parametrize('fast, reference, generate', [
+	(Protocol.readColours, readColoursBySnippet, colourPayload),
+	(Protocol.readRectangles, readRectanglesBySnippet, rectanglePayload),
+	(Protocol.readRectangles, readRectanglesBySnippet,
+			lambda count: rectanglePayload(count, -1920)),
+])
+def testWholePayloadParsersAgreeWithSnippets(fast, reference, generate):
+	random.seed(0)
+	for run in range(3000):
+		payload = generate(random.randint(0, 12))
+		if run % 2:
+			payload = mutate(payload)
+		assert outcome(fast, payload) == outcome(reference, payload), payload
+
+def testResponsesAreFramedWhateverTheReadSize():
+	stream = GREETING + b'ok\r\nstatus:on\r\n' + b'colors:' + \
+			b'1-1,2,3;' * 5000 + b'\r\n'
+	for size in (1, 7, 65536):
+		protocol = Protocol()
+		protocol.sendAll([('setstatus:on', 'ok'), ('getstatus', None),
+				('getcolors', None)])
+		events = []
+		for start in range(0, len(stream), size):
+			protocol.receive(stream[start:start + size])
+			event = protocol.nextEvent()
+			while event is not None:
+				events.append(event)
+				event = protocol.nextEvent()
+		assert events[0].error is None
+		assert [e.text[:9] for e in events[1:]] == ['ok', 'status:on',
+				'colors:1-']
+		assert len(Protocol.readColours(events[3].payload)) == 1
+		assert protocol.pending == 0
+
+def testResponseFailsOnlyWhenNotExpected():
+	protocol = Protocol()
+	protocol.receive(GREETING + b'ok\r\nerror\r\nerror\r\n')
+	protocol.sendAll([('setbrightness:5', 'ok'), ('setbrightness:500', 'ok'),
+			('getbrightness', None)])
+	protocol.nextEvent()
+	assert [protocol.nextEvent().failed for _ in range(3)] == [False, True,
+			False]
+
+@pytest.mark.parametrize('greeting', [b'Lightpack API v1.3\r\n',
+		b'Lightpack API v3.0\r\n', b'Hello\r\n'])
+def testUnsupportedGreeting(greeting):
+	protocol = Protocol()
+	protocol.receive(greeting)
+	assert protocol.nextEvent().error is not None
+
+def testLedArraysKeepMinusSigns(server):
+	server.sizes[1] = (-1920, 0, 100, 100)
+	lp = lightpack.Lightpack(port=server.port)
+	lp.connect()
+	try:
+		assert lp.getLedSizes()[1] == (-1920, 0, 100, 100)
+		assert [tuple(row) for row in lp.getLedSizesArray()][1] == \
+				(-1920, 0, 100, 100)
+	finally:
+		lp.disconnect()
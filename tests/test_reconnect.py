@@ -0,0 +1,80 @@
+"""
+Tests of reconnecting and restoring the session after the connection drops.
+"""
+
+import pytest
+
+import lightpack
+from lightpack import Pipeline
+
+@pytest.fixture
+def lp(server):
+	lp = lightpack.Lightpack(port=server.port, reconnect=True,
+			reconnect_timeout=2)
+	lp.connect()
+	lp.lock()
+	yield lp
+	lp.disconnect()
+
+def drop(lp, server):
+	"""
+	Drop the connection and reset the server, as if Prismatik restarted.
+	"""
+	lp.connection.close()
+	server.brightness = 100
+	server.setCountLeds(5)
+
+def testRestoresLockSettingsAndColours(lp, server):
+	lp.setBrightness(40)
+	lp.setColourToAll((9, 8, 7))
+	drop(lp, server)
+	assert lp.getStatus() == 'on'
+	assert lp.recoveryStats['recoveries'] == 1
+	assert server.brightness == 40
+	assert server.colours == [(9, 8, 7)] * 5
+
+def testRestoresAfterDropInPipeline(lp, server):
+	lp.setColourToAll((9, 8, 7))
+	drop(lp, server)
+	with lp.pipeline():
+		lp.setColour(1, (1, 1, 1))
+	assert server.colours == [(9, 8, 7), (1, 1, 1)] + [(9, 8, 7)] * 3
+
+def testRejectedPipelinedSettingIsNotRestored(lp, server):
+	with pytest.raises(lightpack.CommandFailedError):
+		with lp.pipeline():
+			lp.setBrightness(500)
+	with lp.pipeline():
+		lp.setSmoothness(10)
+	drop(lp, server)
+	assert lp.getStatus() == 'on'
+	assert lp.recoveryStats['failures'] == 0
+	assert server.smoothness == 10
+
+def testColoursSurviveFailedRestoreAttempt(lp, server, monkeypatch):
+	lp.setColourToAll((9, 8, 7))
+	exchange = Pipeline._exchange
+	attempts = []
+
+	def flakyExchange(self, commands):
+		attempts.append(commands)
+		if len(attempts) == 1:
+			raise ConnectionResetError()
+		return exchange(self, commands)
+
+	monkeypatch.setattr(Pipeline, '_exchange', flakyExchange)
+	drop(lp, server)
+	assert lp.getStatus() == 'on'
+	assert len(attempts) == 2
+	assert server.colours == [(9, 8, 7)] * 5
+
+def testGivesUpAfterTimeout(server):
+	lp = lightpack.Lightpack(port=server.port, reconnect=True,
+			reconnect_timeout=0.3)
+	lp.connect()
+	server.stop()
+	lp.connection.close()
+	with pytest.raises(lightpack.CannotConnectError):
+		lp.getStatus()
+	assert lp.recoveryStats['failures'] == 1
+	server.start()
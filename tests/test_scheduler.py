@@ -0,0 +1,56 @@
+"""
+Tests of FrameScheduler pacing.
+"""
+
+import time
+
+import pytest
+
+import lightpack
+
+class Recorder:
+	"""
+	Stand-in for a Lightpack, recording the frames pushed.
+	"""
+
+	def __init__(self, rates=()):
+		self.frames = []
+		self.rates = list(rates)
+
+	def getFps(self):
+		return self.rates.pop(0) if self.rates else 0
+
+	def pushFrame(self, frame):
+		self.frames.append(frame)
+
+def submitFor(scheduler, seconds):
+	end = time.time() + seconds
+	frame = 0
+	while time.time() < end:
+		scheduler.submit(frame)
+		frame += 1
+		time.sleep(0.001)
+
+def testNewestFrameIsSentAtFixedRate():
+	recorder = Recorder()
+	with lightpack.FrameScheduler(recorder, fps=20) as scheduler:
+		submitFor(scheduler, 0.5)
+	assert 5 <= len(recorder.frames) <= 12
+	stats = scheduler.stats
+	assert stats['sent'] == len(recorder.frames)
+	assert stats['submitted'] == stats['sent'] + stats['coalesced']
+
+def testZeroRateDoesntUnpaceFrames():
+	recorder = Recorder([0])
+	with lightpack.FrameScheduler(recorder, adapt_interval=0.05) as scheduler:
+		assert scheduler.fps == lightpack.FrameScheduler.fallbackFps
+		submitFor(scheduler, 0.3)
+	assert len(recorder.frames) <= 10
+
+def testStartTwice():
+	scheduler = lightpack.FrameScheduler(Recorder(), fps=10)
+	scheduler.start()
+	with pytest.raises(RuntimeError):
+		scheduler.start()
+	scheduler.stop()
+	scheduler.stop()
@@ -0,0 +1,83 @@
+"""
+Tests of ThreadedLightpack, used from several threads at once.
+"""
+
+import threading
+
+import pytest
+
+import lightpack
+from lightpack_mock import MockPrismatik
+
+@pytest.fixture
+def lp(server):
+	lp = lightpack.ThreadedLightpack(port=server.port)
+	lp.connect()
+	yield lp
+	lp.disconnect()
+
+def testCommandsFromManyThreads(lp, server):
+	lp.lock()
+
+	def work(led):
+		for value in range(20):
+			lp.setColour(led, (value, led, 0))
+			assert lp.getStatus() == 'on'
+
+	threads = [threading.Thread(target=work, args=(led,)) for led in range(5)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	lp.flush()
+	assert server.colours == [(19, led, 0) for led in range(5)]
+
+def testFlushRaisesFireAndForgetFailure(lp):
+	lp.lock()
+	lp.setBrightness(500)
+	lp.setBrightness(50)
+	with pytest.raises(lightpack.CommandFailedError) as raised:
+		lp.flush()
+	assert raised.value.command == 'setbrightness:500'
+	lp.flush()
+
+def testBusyLockLeavesLightpackUnlocked(lp, server):
+	other = lightpack.Lightpack(port=server.port)
+	other.connect()
+	other.lock()
+	try:
+		with pytest.raises(lightpack.CommandFailedError):
+			lp.lock()
+		assert not lp._locked
+	finally:
+		other.disconnect()
+
+def testFailedColoursDontDeadlockPushFrame():
+	with MockPrismatik(leds=5, latency=0.05) as server:
+		lp = lightpack.ThreadedLightpack(port=server.port)
+		lp.connect()
+		deadlocked = False
+		try:
+			lp.getCountLeds()
+			# Not locked, so this fails on the I/O thread while the frame is 
+			# pushed from another
+			lp.setColour(0, (1, 2, 3))
+			lp.setProfile('Lightpack')
+			pushed = []
+			thread = threading.Thread(target=lambda: pushed.append(
+					lp.pushFrame([(9, 9, 9)] * 3)))
+			thread.daemon = True
+			thread.start()
+			thread.join(3)
+			deadlocked = thread.is_alive()
+			assert not deadlocked
+			assert pushed == [3]
+			with pytest.raises(lightpack.CommandFailedError):
+				lp.flush()
+			# Every colour command failed, so all of them are sent again
+			lp.lock()
+			assert lp.pushFrame([(9, 9, 9)] * 3) == 3
+		finally:
+			# Disconnecting would wait for the deadlocked I/O thread
+			if not deadlocked:
+				lp.disconnect()
@@ -0,0 +1,50 @@
+"""
+Tests of recording and replaying traces.
+"""
+
+import lightpack
+from lightpack_trace import RECEIVED, SENT, TraceRecorder, readTrace, replay
+
+def testRecordAndReplay(server, tmpdir):
+	path = str(tmpdir.join('session.lptr'))
+	lp = lightpack.Lightpack(port=server.port)
+	with TraceRecorder(lp, path) as recorder:
+		lp.connect()
+		lp.lock()
+		with lp.pipeline():
+			lp.setBrightness(40)
+			lp.setGamma(1.5)
+		lp.getStatus()
+		lp.disconnect()
+	records = readTrace(path)
+	assert len(records) == recorder.records
+	assert records[0][0] == RECEIVED
+	assert [data for direction, _, data in records if direction == SENT][1] == \
+			b'setbrightness:40\nsetgamma:1.5\n'
+	result = replay(path, '127.0.0.1', server.port, fast=True)
+	assert result.commands == 5
+	assert result.mismatches == 0
+
+def testReplayTraceRecordedAfterConnecting(server, tmpdir):
+	path = str(tmpdir.join('late.lptr'))
+	lp = lightpack.Lightpack(port=server.port)
+	lp.connect()
+	with TraceRecorder(lp, path):
+		lp.getStatus()
+		lp.getMode()
+	lp.disconnect()
+	assert readTrace(path)[0][0] == SENT
+	result = replay(path, '127.0.0.1', server.port, fast=True)
+	assert result.commands == 2
+	assert result.mismatches == 0
+
+def testReplayLongResponses(server, tmpdir):
+	server.setCountLeds(5000)
+	path = str(tmpdir.join('long.lptr'))
+	lp = lightpack.Lightpack(port=server.port)
+	with TraceRecorder(lp, path):
+		lp.connect()
+		lp.getColoursFromAll()
+		lp.disconnect()
+	assert max([len(data) for _, _, data in readTrace(path)]) > 32768
+	assert replay(path, '127.0.0.1', server.port, fast=True).mismatches == 0